@@ -1,17 +1,59 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from uvicorn import run as app_run
 from typing import Optional
-
-from src.constants import APP_HOST, APP_PORT
-from src.pipeline.prediction_pipeline import VehicleData, VehicleDataClassifier
-from src.pipeline.training_pipeline import TrainingPipeline
-
-
-app = FastAPI()
+from contextlib import asynccontextmanager
+
+import asyncio
+
+from src.constants import APP_HOST, APP_PORT, PREDICTION_BATCH_MAX_RECORDS, PREDICTION_WARMUP_RETRY_SECONDS
+from src.pipeline.training_jobs import TrainingJobManager
+from src.pipeline.executor import PredictionExecutor, validate_feature_records
+from src.pipeline.micro_batcher import PredictionBatcher
+from src.logger import logging
+from src.utils.metrics import PREDICTION_STAGE_SECONDS, REGISTRY, Counter, Histogram
+
+
+REQUESTS = Counter("prediction_requests_total", "Prediction requests received", labelnames=("endpoint",))
+ERRORS = Counter("prediction_errors_total", "Prediction requests that failed", labelnames=("endpoint",))
+REQUEST_SECONDS = Histogram("prediction_request_seconds", "End-to-end latency of prediction requests",
+                            labelnames=("endpoint",))
+FORM_PARSE_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="form_parse")
+
+
+async def warm_up(app: FastAPI):
+    """
+    Preloads the model and scores a dummy record, retrying until it succeeds.
+    /health/ready reports 503 until then.
+    """
+    while True:
+        try:
+            await prediction_executor.warm_up()
+            app.state.ready = True
+            app.state.warm_up_error = None
+            return
+        except Exception as e:
+            app.state.warm_up_error = str(e)
+            logging.error(f"Warm-up failed, retrying in {PREDICTION_WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(PREDICTION_WARMUP_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warm_up_error = None
+    # runs in the background so liveness probes pass while the model is downloaded
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    warm_up_task.cancel()
+    await prediction_batcher.stop()
+    prediction_executor.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -28,72 +70,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Runs model loading and inference off the event loop (thread or process pool)
+prediction_executor = PredictionExecutor()
+
+# Runs /train requests in a background worker process
+training_jobs = TrainingJobManager()
+
+# Coalesces concurrent single-row predictions into one model call
+prediction_batcher = PredictionBatcher(score_fn=prediction_executor.predict_records,
+                                       max_in_flight=prediction_executor.max_workers)
+
 
 class DataForm:
     def __init__(self, request: Request):
         self.request = request
 
     async def get_vehicle_data(self):
-        form = await self.request.form()
-
-        return {
-            "Gender": int(form.get("Gender")),
-            "Age": int(form.get("Age")),
-            "Driving_License": int(form.get("Driving_License")),
-            "Region_Code": float(form.get("Region_Code")),
-            "Previously_Insured": int(form.get("Previously_Insured")),
-            "Annual_Premium": float(form.get("Annual_Premium")),
-            "Policy_Sales_Channel": float(form.get("Policy_Sales_Channel")),
-            "Vintage": int(form.get("Vintage")),
-            "Vehicle_Age_lt_1_Year": int(form.get("Vehicle_Age_lt_1_Year")),
-            "Vehicle_Age_gt_2_Years": int(form.get("Vehicle_Age_gt_2_Years")),
-            "Vehicle_Damage_Yes": int(form.get("Vehicle_Damage_Yes")),
-        }
+        with FORM_PARSE_SECONDS.time():
+            form = await self.request.form()
+
+            return {
+                "Gender": int(form.get("Gender")),
+                "Age": int(form.get("Age")),
+                "Driving_License": int(form.get("Driving_License")),
+                "Region_Code": float(form.get("Region_Code")),
+                "Previously_Insured": int(form.get("Previously_Insured")),
+                "Annual_Premium": float(form.get("Annual_Premium")),
+                "Policy_Sales_Channel": float(form.get("Policy_Sales_Channel")),
+                "Vintage": int(form.get("Vintage")),
+                "Vehicle_Age_lt_1_Year": int(form.get("Vehicle_Age_lt_1_Year")),
+                "Vehicle_Age_gt_2_Years": int(form.get("Vehicle_Age_gt_2_Years")),
+                "Vehicle_Damage_Yes": int(form.get("Vehicle_Damage_Yes")),
+            }
 
 
 @app.get("/")
 async def index(request: Request):
     return templates.TemplateResponse(
+        request,
         "vehicledata.html",
-        {"request": request, "context": None},
+        {"context": None},
     )
 
 
 @app.get("/train")
 async def train_model():
-    try:
-        train_pipeline = TrainingPipeline()
-        train_pipeline.run_pipeline()
-        return Response("Training successful!")
-    except Exception as e:
-        return Response(f"Error occurred: {e}")
+    """
+    Enqueues a training job and returns its id right away.
+    While a job is queued or running, the same job is returned instead of starting another one.
+    """
+    job, created = training_jobs.submit()
+    return JSONResponse({"job_id": job.job_id, "status": job.status, "deduplicated": not created},
+                        status_code=202)
+
+
+@app.get("/train/{job_id}")
+async def train_status(job_id: str):
+    status = training_jobs.get_status(job_id)
+    if status is None:
+        return JSONResponse({"error": f"Unknown training job {job_id}"}, status_code=404)
+    return JSONResponse(status)
 
 
 @app.post("/")
 async def predict(request: Request):
+    REQUESTS.labels(endpoint="form").inc()
     try:
-        form = DataForm(request)
-        data_dict = await form.get_vehicle_data()
+        with REQUEST_SECONDS.labels(endpoint="form").time():
+            form = DataForm(request)
+            data_dict = await form.get_vehicle_data()
 
-        vehicle_data = VehicleData(**data_dict)
-        vehicle_df = vehicle_data.get_vehicle_input_data_frame()
-
-        model_predictor = VehicleDataClassifier()
-        prediction = model_predictor.predict(vehicle_df)[0]
+            prediction = await prediction_batcher.submit(data_dict)
 
         status = "Customer is likely to buy insurance" if prediction == 1 else "Customer is not likely to buy insurance"
 
         return templates.TemplateResponse(
+            request,
             "vehicledata.html",
-            {"request": request, "context": status},
+            {"context": status},
         )
 
     except Exception as e:
+        ERRORS.labels(endpoint="form").inc()
         return templates.TemplateResponse(
+            request,
             "vehicledata.html",
-            {"request": request, "context": f"Error: {e}"},
+            {"context": f"Error: {e}"},
         )
 
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Scores a JSON list of records (or {"records": [...]}) in one vectorized call.
+    Returns predictions and probabilities of class 1 in input order.
+    Invalid input gets a 4xx with the reason; failures of the service get a 500 without details.
+    """
+    REQUESTS.labels(endpoint="batch").inc()
+    with REQUEST_SECONDS.labels(endpoint="batch").time():
+        try:
+            payload = await request.json()
+        except ValueError:
+            ERRORS.labels(endpoint="batch").inc()
+            return JSONResponse({"error": "Request body is not valid JSON"}, status_code=400)
+        records = payload.get("records") if isinstance(payload, dict) else payload
+
+        if not isinstance(records, list) or not records:
+            ERRORS.labels(endpoint="batch").inc()
+            return JSONResponse({"error": "Expected a non-empty list of records"}, status_code=400)
+        if len(records) > PREDICTION_BATCH_MAX_RECORDS:
+            ERRORS.labels(endpoint="batch").inc()
+            return JSONResponse({"error": f"At most {PREDICTION_BATCH_MAX_RECORDS} records per request"},
+                                status_code=413)
+        try:
+            validate_feature_records(records)
+        except ValueError as e:
+            ERRORS.labels(endpoint="batch").inc()
+            return JSONResponse({"error": str(e)}, status_code=422)
+
+        try:
+            predictions, probabilities = await prediction_executor.predict_batch(records)
+        except Exception:
+            ERRORS.labels(endpoint="batch").inc()
+            logging.exception("Batch prediction failed")
+            return JSONResponse({"error": "Internal error while scoring the batch"}, status_code=500)
+
+        return JSONResponse({"predictions": predictions, "probabilities": probabilities})
+
+
+@app.get("/health/live")
+async def health_live():
+    return JSONResponse({"status": "alive"})
+
+
+@app.get("/health/ready")
+async def health_ready(request: Request):
+    if not request.app.state.ready:
+        return JSONResponse({"status": "warming_up", "error": request.app.state.warm_up_error}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app_run(app, host="0.0.0.0", port="8000")
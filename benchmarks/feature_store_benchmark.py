@@ -0,0 +1,81 @@
+"""
+Compares the CSV and Parquet feature store formats on data shaped like Vehicle-Data.
+
+Both files are written chunk by chunk through FeatureStoreWriter with the schema.yaml dtypes,
+then read back in full and with a column projection plus a row filter. File size, write and
+read time and the memory of the loaded DataFrame, as read and after the schema downcast of
+load_feature_store, are reported.
+
+Usage: python -m benchmarks.feature_store_benchmark [--rows 381109] [--chunk-size 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.constants import SCHEMA_FILE_PATH
+from src.data_access.feature_store import load_feature_store, read_feature_store, write_feature_store
+from src.utils.main_utils import read_yaml_file
+
+
+def synthetic_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 85, n_rows),
+        "Driving_License": rng.integers(0, 2, n_rows),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(float),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], n_rows),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": rng.integers(2630, 540000, n_rows).astype(float),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(float),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": (rng.random(n_rows) < 0.12).astype(int),
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=381109, help="Rows of the synthetic collection")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per written chunk")
+    args = parser.parse_args()
+
+    schema = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+    data = synthetic_data(args.rows)
+    chunks = [data.iloc[i:i + args.chunk_size] for i in range(0, len(data), args.chunk_size)]
+    upper_id = args.rows // 5
+
+    print(f"{'format':<8} {'size MB':>8} {'write s':>8} {'read s':>8} {'memory MB':>10} {'downcast MB':>12} {'projected read s':>17}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for file_format in ("csv", "parquet"):
+            file_path = os.path.join(work_dir, f"data.{file_format}")
+            _, write_seconds = timed(lambda: write_feature_store(chunks, file_path, schema=schema))
+            dataframe, read_seconds = timed(lambda: read_feature_store(file_path))
+            downcast = load_feature_store(file_path, schema, stage="benchmark")
+            if file_format == "parquet":
+                _, projected_seconds = timed(lambda: read_feature_store(file_path, columns=["id", "Age", "Response"],
+                                                                        filters=[("id", "<=", upper_id)]))
+            else:
+                # CSV has no row statistics: read the projected columns, then filter in memory
+                _, projected_seconds = timed(lambda: read_feature_store(file_path, columns=["id", "Age", "Response"])
+                                             .query(f"id <= {upper_id}"))
+            print(f"{file_format:<8} {os.path.getsize(file_path) / 2 ** 20:>8.2f} {write_seconds:>8.2f} "
+                  f"{read_seconds:>8.3f} {dataframe.memory_usage(deep=True).sum() / 2 ** 20:>10.1f} "
+                  f"{downcast.memory_usage(deep=True).sum() / 2 ** 20:>12.1f} "
+                  f"{projected_seconds:>17.3f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
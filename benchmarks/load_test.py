@@ -0,0 +1,268 @@
+"""
+Replays prediction requests against app.py in-process and reports throughput and latency.
+
+Requests go through httpx's ASGI transport, so the whole serving path (routing, form parsing,
+batching, the executor, the model) is measured without a network or a uvicorn process. The S3
+model store is replaced by a local model: either one saved by ModelTrainer (--model-path) or a
+forest fitted on synthetic data with ModelTrainer's hyper-parameters.
+
+The workload is either replayed from a JSONL file or generated. Each line of a replay file is
+a feature record (sent to the form endpoint) or {"endpoint": "/predict/batch", "json": [...]} /
+{"endpoint": "/", "form": {...}}.
+
+With --rate the requests are sent open-loop at that many per second and latency is measured
+from the scheduled send time, so a slow server cannot hide its queueing delay; without it,
+--concurrency clients send back to back.
+
+A run whose error rate is above --max-error-rate exits with status 1 and is never saved as a
+baseline. Run the benchmarks from the repository root, as modules:
+
+Usage:
+    python -m benchmarks.load_test --requests 2000 --concurrency 32 --save-baseline baseline.json
+    python -m benchmarks.load_test --requests 2000 --concurrency 32 --baseline baseline.json
+    python -m benchmarks.load_test --replay recorded.jsonl --rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "load-test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "load-test")
+
+from src.constants import PREDICTION_FEATURE_COLUMNS, SCHEMA_FILE_PATH
+from src.entity.config_entity import ModelTrainerConfig, VehiclePredictorConfig
+from src.entity.estimator import MyModel
+from src.entity.s3_estimator import ModelHolder
+from src.entity.model_bundle import load_model_file
+from src.utils.main_utils import read_yaml_file
+
+
+LOCAL_MODEL_VERSION = "load-test"
+# Options that define the workload; a baseline is only comparable when they match
+WORKLOAD_KEYS = ("model_path", "replay", "endpoint", "requests", "batch_size", "distinct", "concurrency", "rate", "seed")
+
+
+def synthetic_records(n_rows: int, seed: int = 0, distinct: Optional[int] = None) -> List[dict]:
+    """
+    Feature records in the value ranges of the training data.
+    With distinct, only that many different records are drawn and then repeated.
+    """
+    rng = np.random.default_rng(seed)
+    n_unique = min(distinct or n_rows, n_rows)
+    unique = [{
+        "Gender": int(rng.integers(0, 2)),
+        "Age": int(rng.integers(20, 85)),
+        "Driving_License": int(rng.integers(0, 2)),
+        "Region_Code": float(rng.integers(0, 53)),
+        "Previously_Insured": int(rng.integers(0, 2)),
+        "Annual_Premium": float(rng.integers(2630, 540000)),
+        "Policy_Sales_Channel": float(rng.integers(1, 164)),
+        "Vintage": int(rng.integers(10, 300)),
+        "Vehicle_Age_lt_1_Year": int(rng.integers(0, 2)),
+        "Vehicle_Age_gt_2_Years": int(rng.integers(0, 2)),
+        "Vehicle_Damage_Yes": int(rng.integers(0, 2)),
+    } for _ in range(n_unique)]
+    return [unique[i] for i in rng.integers(0, n_unique, n_rows)] if n_unique < n_rows else unique
+
+
+def synthetic_model(n_rows: int = 20000) -> MyModel:
+    """
+    Fits DataTransformation's preprocessor and ModelTrainer's forest on synthetic records.
+    """
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+    schema = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+    data = pd.DataFrame.from_records(synthetic_records(n_rows, seed=1), columns=PREDICTION_FEATURE_COLUMNS)
+    target = ((data["Vehicle_Damage_Yes"] == 1) & (data["Previously_Insured"] == 0)).astype(int)
+
+    preprocessor = Pipeline(steps=[("preprocessor", ColumnTransformer(
+        transformers=[("standardscaler", StandardScaler(), schema["num_features"]),
+                      ("minmaxscaler", MinMaxScaler(), schema["mm_columns"])],
+        remainder="passthrough"))])
+    features = preprocessor.fit_transform(data)
+
+    config = ModelTrainerConfig()
+    model = RandomForestClassifier(n_estimators=config._n_estimators,
+                                   min_samples_split=config._min_samples_split,
+                                   min_samples_leaf=config._min_samples_leaf,
+                                   max_depth=config._max_depth,
+                                   criterion=config._criterion,
+                                   random_state=config._random_state).fit(features, target)
+    return MyModel(preprocessing_object=preprocessor, trained_model_object=model)
+
+
+def install_local_model(model_path: Optional[str]) -> None:
+    """Serves a local model through the process-wide holder instead of downloading it from S3."""
+    model = load_model_file(model_path) if model_path else synthetic_model()
+    config = VehiclePredictorConfig()
+    holder = ModelHolder.get_holder(config.model_bucket_name, config.model_file_path, refresh_interval=0)
+    holder.install(model, LOCAL_MODEL_VERSION)
+
+
+def build_workload(args) -> List[dict]:
+    """Returns the requests to send, as {"endpoint", "json" | "form"} dicts."""
+    if args.replay:
+        with open(args.replay) as replay:
+            lines = [json.loads(line) for line in replay if line.strip()]
+        workload = [line if "endpoint" in line else {"endpoint": "/", "form": line} for line in lines]
+        if args.requests:
+            workload = [workload[i % len(workload)] for i in range(args.requests)]
+        return workload
+
+    records = synthetic_records(args.requests * args.batch_size, seed=args.seed, distinct=args.distinct)
+    if args.endpoint == "batch":
+        return [{"endpoint": "/predict/batch", "json": records[i:i + args.batch_size]}
+                for i in range(0, len(records), args.batch_size)]
+    return [{"endpoint": "/", "form": record} for record in records]
+
+
+async def send(client, request: dict) -> int:
+    if "json" in request:
+        response = await client.post(request["endpoint"], json=request["json"])
+    else:
+        response = await client.post(request["endpoint"], data={k: str(v) for k, v in request["form"].items()})
+    # the form endpoint renders errors into the page with a 200
+    if response.status_code == 200 and "form" in request and "Error:" in response.text:
+        return 599
+    return response.status_code
+
+
+async def run_workload(workload: List[dict], concurrency: int, rate: Optional[float]) -> dict:
+    import httpx
+    import app as serving_app
+
+    latencies = np.zeros(len(workload))
+    statuses = Counter()
+    failures = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=serving_app.app)
+
+    # the lifespan runs the model warm-up and shuts the executor down afterwards
+    async with serving_app.lifespan(serving_app.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        while not serving_app.app.state.ready:
+            await asyncio.sleep(0.05)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def one(index: int, request: dict) -> None:
+            scheduled = start + index / rate if rate else None
+            if scheduled is not None:
+                await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            async with semaphore:
+                sent = scheduled if scheduled is not None else loop.time()
+                try:
+                    status = await send(client, request)
+                except Exception as e:
+                    # status 0: the app raised instead of responding
+                    status = 0
+                    failures[f"{type(e).__name__}: {e}"] += 1
+                latencies[index] = loop.time() - sent
+                statuses[status] += 1
+
+        await asyncio.gather(*(one(i, request) for i, request in enumerate(workload)))
+        elapsed = loop.time() - start
+
+    ok = statuses.get(200, 0)
+    return {
+        "requests": len(workload),
+        "ok": ok,
+        "errors": len(workload) - ok,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "failures": dict(failures.most_common(5)),
+        "seconds": elapsed,
+        "throughput_rps": len(workload) / elapsed,
+        "latency_ms": {
+            "mean": float(latencies.mean() * 1000),
+            "p50": float(np.percentile(latencies, 50) * 1000),
+            "p95": float(np.percentile(latencies, 95) * 1000),
+            "p99": float(np.percentile(latencies, 99) * 1000),
+            "max": float(latencies.max() * 1000),
+        },
+    }
+
+
+def flatten(results: dict) -> dict:
+    metrics = {"throughput_rps": results["throughput_rps"], "errors": results["errors"]}
+    metrics.update({f"{name}_ms": value for name, value in results["latency_ms"].items()})
+    return metrics
+
+
+def print_results(results: dict, baseline: Optional[dict] = None) -> None:
+    print(f"{results['requests']} requests in {results['seconds']:.2f}s, statuses {results['statuses']}")
+    for failure, count in results["failures"].items():
+        print(f"  {count} x {failure[:200]}")
+    current = flatten(results)
+    previous = flatten(baseline["results"]) if baseline else {}
+    header = f"{'metric':<16} {'value':>12}"
+    print(header + (f" {'baseline':>12} {'change':>9}" if baseline else ""))
+    for name, value in current.items():
+        line = f"{name:<16} {value:>12.2f}"
+        if name in previous:
+            change = (value - previous[name]) / previous[name] * 100 if previous[name] else 0.0
+            line += f" {previous[name]:>12.2f} {change:>+8.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="Local model saved by ModelTrainer; synthetic when omitted")
+    parser.add_argument("--replay", default=None, help="JSONL file of recorded requests")
+    parser.add_argument("--endpoint", choices=("form", "batch"), default="form", help="Endpoint of generated requests")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests to send (replays loop over the file)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Records per generated /predict/batch request")
+    parser.add_argument("--distinct", type=int, default=None, help="Draw generated records from this many distinct ones")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop requests per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail the run when more than this share of the requests is not answered with a 200")
+    parser.add_argument("--save-baseline", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare against a JSON file written by --save-baseline")
+    args = parser.parse_args()
+    if args.endpoint == "form":
+        args.batch_size = 1
+
+    install_local_model(args.model_path)
+    workload = build_workload(args)
+    results = asyncio.run(run_workload(workload, args.concurrency, args.rate))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        changed = [key for key in WORKLOAD_KEYS if baseline["config"].get(key) != getattr(args, key)]
+        if changed:
+            print(f"Warning: the baseline was recorded with a different workload ({', '.join(changed)})")
+    print_results(results, baseline)
+
+    error_rate = results["errors"] / max(results["requests"], 1)
+    if results["ok"] == 0 or error_rate > args.max_error_rate:
+        print(f"Error: {error_rate:.1%} of the requests failed (--max-error-rate {args.max_error_rate:.1%}); "
+              f"the results are not a valid measurement" + (", baseline not saved" if args.save_baseline else ""),
+              file=sys.stderr)
+        return 1
+
+    if args.save_baseline:
+        config = {key: value for key, value in vars(args).items()
+                  if key not in ("save_baseline", "baseline", "max_error_rate")}
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"config": config, "python": platform.python_version(), "results": results},
+                      baseline_file, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Compares the dill pickle written by save_object with the model bundle formats.
+
+For each format the file size, the load time and the peak memory allocated while loading
+(memory-mapped arrays are not allocated) are measured in a fresh interpreter, and the loaded
+model's predictions are checked against the pickle's. Without --model-path, a forest fitted on
+synthetic data with ModelTrainer's hyper-parameters is used.
+
+Usage: python -m benchmarks.model_bundle_benchmark [--model-path artifact/.../model.pkl] [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+PROBE = """
+import json, time, tracemalloc
+import numpy as np
+from src.entity.model_bundle import load_model_file
+tracemalloc.start()
+start = time.perf_counter()
+model = load_model_file({path!r})
+seconds = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+records = json.load(open({records_path!r}))
+prediction, proba = model.predict_records_with_proba(records)
+np.save({output_path!r}, np.column_stack([prediction, proba]))
+print(json.dumps({{"load_seconds": seconds, "load_peak_mb": peak / 2 ** 20}}))
+"""
+
+
+def probe(path: str, records_path: str, output_path: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    code = PROBE.format(path=path, records_path=records_path, output_path=output_path)
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="Model pickle saved by ModelTrainer; synthetic when omitted")
+    parser.add_argument("--records", type=int, default=2000, help="Records predicted for the identity check")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    import numpy as np
+    from benchmarks.load_test import synthetic_model, synthetic_records
+    from src.entity.model_bundle import save_bundle
+    from src.utils.main_utils import load_object, save_object
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pickle_path = args.model_path
+        if pickle_path is None:
+            pickle_path = os.path.join(work_dir, "model.pkl")
+            save_object(pickle_path, synthetic_model())
+        model = load_object(pickle_path)
+
+        paths = {
+            "pickle": pickle_path,
+            "bundle": save_bundle(model, os.path.join(work_dir, "model.bundle")),
+            "bundle (zlib)": save_bundle(model, os.path.join(work_dir, "model-zlib.bundle"), compress=True),
+        }
+        records_path = os.path.join(work_dir, "records.json")
+        with open(records_path, "w") as records_file:
+            json.dump(synthetic_records(args.records, seed=2), records_file)
+
+        print(f"{'format':<16} {'size MB':>9} {'load ms':>9} {'load peak MB':>13} {'identical':>10}")
+        reference = None
+        for name, path in paths.items():
+            output_path = os.path.join(work_dir, f"{name.replace(' ', '_')}.npy")
+            results = [probe(path, records_path, output_path) for _ in range(args.runs)]
+            outputs = np.load(output_path)
+            reference = outputs if reference is None else reference
+            print(f"{name:<16} {os.path.getsize(path) / 2 ** 20:>9.2f} "
+                  f"{min(result['load_seconds'] for result in results) * 1000:>9.1f} "
+                  f"{min(result['load_peak_mb'] for result in results):>13.2f} "
+                  f"{str(np.array_equal(outputs, reference)):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures export throughput of a MongoDB collection for several worker counts.
+
+Each run splits the collection into as many _id ranges as workers and drains every range
+with its own process and MongoClient, as DataIngestion does with DATA_INGESTION_EXPORT_WORKERS.
+The connection string is read from MONGODB_URL_KEY, e.g. a local mongod
+(mongodb://localhost:27017). With --seed-rows, the collection is first filled with that many
+synthetic documents shaped like the Vehicle-Data collection.
+
+Usage: python -m benchmarks.mongo_export_benchmark --collection Vehicle-Bench --seed-rows 500000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.constants import DATA_INGESTION_EXPORT_BATCH_SIZE, FILE_NAME, SCHEMA_FILE_PATH
+from src.data_access.feature_store import merge_shards
+from src.data_access.vehical_data import VehicleData
+from src.utils.main_utils import read_yaml_file
+
+
+def seed_collection(vehicle_data: VehicleData, collection_name: str, rows: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    collection = vehicle_data.get_collection(collection_name)
+    collection.drop()
+    for start in range(0, rows, 10000):
+        n = min(10000, rows - start)
+        collection.insert_many([{
+            "id": start + i + 1,
+            "Gender": "Male" if rng.random() < 0.5 else "Female",
+            "Age": int(rng.integers(20, 85)),
+            "Driving_License": int(rng.random() < 0.99),
+            "Region_Code": float(rng.integers(0, 53)),
+            "Previously_Insured": int(rng.integers(0, 2)),
+            "Vehicle_Age": ["< 1 Year", "1-2 Year", "> 2 Years"][int(rng.integers(0, 3))],
+            "Vehicle_Damage": "Yes" if rng.random() < 0.5 else "No",
+            "Annual_Premium": float(rng.integers(2630, 540000)),
+            "Policy_Sales_Channel": float(rng.integers(1, 164)),
+            "Vintage": int(rng.integers(10, 300)),
+            "Response": int(rng.random() < 0.12),
+        } for i in range(n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="Vehicle-Data")
+    parser.add_argument("--seed-rows", type=int, default=0, help="Replace the collection with this many synthetic rows")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=DATA_INGESTION_EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    vehicle_data = VehicleData()
+    if args.seed_rows:
+        seed_collection(vehicle_data, args.collection, args.seed_rows)
+
+    schema = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+    column_types = {name: column_type for column in schema["columns"] for name, column_type in column.items()}
+
+    print(f"{'workers':>8} {'rows':>10} {'seconds':>9} {'rows/s':>10} {'slowest shard s':>16}")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as work_dir:
+            start = time.perf_counter()
+            manifest = vehicle_data.export_collection_in_parallel(
+                collection_name=args.collection, shard_dir=os.path.join(work_dir, "shards"), workers=workers,
+                columns=list(column_types), column_types=column_types, batch_size=args.batch_size, schema=schema)
+            rows = merge_shards(manifest, os.path.join(work_dir, FILE_NAME))
+            elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {rows:>10} {elapsed:>9.2f} {rows / elapsed:>10.0f} "
+              f"{max(entry['seconds'] for entry in manifest):>16.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
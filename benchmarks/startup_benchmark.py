@@ -0,0 +1,70 @@
+"""
+Measures the cold-start cost of a serving worker: import time and resident memory.
+
+Each measurement runs in a fresh interpreter. The serving app is compared with the training
+pipeline, whose import graph (imblearn, every component, the Mongo client) the serving
+workers no longer load. With --model-path, a locally saved model is installed in place of
+the S3 download and the time and memory of the startup warm-up are reported as well.
+
+Usage: python -m benchmarks.startup_benchmark [--model-path artifact/.../model.pkl] [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+result = {{"import_seconds": time.perf_counter() - start,
+           "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}
+model_path = {model_path!r}
+if model_path:
+    import asyncio
+    from src.entity.config_entity import VehiclePredictorConfig
+    from src.entity.s3_estimator import ModelHolder
+    from src.entity.model_bundle import load_model_file
+    config = VehiclePredictorConfig()
+    start = time.perf_counter()
+    ModelHolder.get_holder(config.model_bucket_name, config.model_file_path, 0).install(load_model_file(model_path), "local")
+    asyncio.run({module}.prediction_executor.warm_up())
+    result["warm_up_seconds"] = time.perf_counter() - start
+    result["rss_mb_warm"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(result))
+"""
+
+
+def probe(module: str, model_path: str = None) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), PREDICTION_EXECUTOR_MODE="thread")
+    output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, model_path=model_path)],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def best_of(module: str, runs: int, model_path: str = None) -> dict:
+    results = [probe(module, model_path) for _ in range(runs)]
+    return {key: min(result[key] for result in results) for key in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="Local model file saved by ModelTrainer")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'import':<36} {'seconds':>8} {'RSS MB':>8}")
+    for module in ("app", "src.pipeline.training_pipeline"):
+        result = best_of(module, args.runs)
+        print(f"{module:<36} {result['import_seconds']:>8.2f} {result['rss_mb']:>8.1f}")
+
+    if args.model_path:
+        result = best_of("app", args.runs, args.model_path)
+        print(f"{'app + warm-up':<36} {result['import_seconds'] + result['warm_up_seconds']:>8.2f} "
+              f"{result['rss_mb_warm']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
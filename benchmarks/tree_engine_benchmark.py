@@ -0,0 +1,81 @@
+"""
+Compares single-row and batch latency of the flattened tree engine against scikit-learn.
+
+A RandomForestClassifier is fitted on synthetic data shaped like the transformed training
+features, with the same hyper-parameters ModelTrainer uses, then both engines score the same
+rows and their predictions and probabilities are checked for equality.
+
+Usage: python -m benchmarks.tree_engine_benchmark [--rows 10000] [--repeats 20]
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.entity.config_entity import ModelTrainerConfig
+from src.entity.tree_engine import FlatForest
+
+
+def make_features(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.normal(size=n_rows),                          # Age (standardised)
+        rng.normal(size=n_rows),                          # Vintage (standardised)
+        rng.random(n_rows),                               # Annual_Premium (min-max scaled)
+        rng.integers(0, 2, n_rows),                       # Gender
+        rng.integers(0, 2, n_rows),                       # Driving_License
+        rng.integers(0, 53, n_rows),                      # Region_Code
+        rng.integers(0, 2, n_rows),                       # Previously_Insured
+        rng.integers(1, 164, n_rows),                     # Policy_Sales_Channel
+        rng.integers(0, 2, n_rows),                       # Vehicle_Age_lt_1_Year
+        rng.integers(0, 2, n_rows),                       # Vehicle_Age_gt_2_Years
+        rng.integers(0, 2, n_rows),                       # Vehicle_Damage_Yes
+    ]).astype(np.float64)
+    y = ((X[:, 10] == 1) & (X[:, 6] == 0) & (rng.random(n_rows) < 0.8)).astype(int)
+    return X, y
+
+
+def time_call(fn, X, repeats: int) -> float:
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(X)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train-rows", type=int, default=50000)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    config = ModelTrainerConfig()
+    X_train, y_train = make_features(args.train_rows, seed=1)
+    model = RandomForestClassifier(n_estimators=config._n_estimators,
+                                   min_samples_split=config._min_samples_split,
+                                   min_samples_leaf=config._min_samples_leaf,
+                                   max_depth=config._max_depth,
+                                   criterion=config._criterion,
+                                   random_state=config._random_state).fit(X_train, y_train)
+
+    start = time.perf_counter()
+    engine = FlatForest.from_sklearn(model)
+    print(f"Compiled {engine.n_trees} trees / {engine.node_count} nodes in {time.perf_counter() - start:.3f}s")
+
+    X, _ = make_features(args.rows, seed=2)
+    identical = (np.array_equal(model.predict(X), engine.predict(X))
+                 and np.array_equal(model.predict_proba(X), engine.predict_proba(X)))
+    print(f"Identical predictions and probabilities: {identical}")
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'engine ms':>12} {'speedup':>8}")
+    for n_rows in (1, 10, 100, 1000, args.rows):
+        batch = X[:n_rows]
+        sklearn_time = time_call(model.predict, batch, args.repeats)
+        engine_time = time_call(engine.predict, batch, args.repeats)
+        print(f"{n_rows:>8} {sklearn_time * 1000:>12.3f} {engine_time * 1000:>12.3f} {sklearn_time / engine_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
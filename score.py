@@ -0,0 +1,20 @@
+import argparse
+
+from src.constants import BATCH_SCORING_CHUNK_SIZE, BATCH_SCORING_WORKERS
+from src.pipeline.batch_scoring import BatchScoringPipeline
+
+
+parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of customers in bulk.")
+parser.add_argument("input_path", help="CSV or JSONL file with one customer per row")
+parser.add_argument("output_path", help="CSV or JSONL file to write id, prediction and probability to")
+parser.add_argument("--model-path", default=None, help="Local model.pkl; defaults to the production model in S3")
+parser.add_argument("--chunk-size", type=int, default=BATCH_SCORING_CHUNK_SIZE)
+parser.add_argument("--workers", type=int, default=BATCH_SCORING_WORKERS)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    pipeline = BatchScoringPipeline(input_path=args.input_path, output_path=args.output_path,
+                                    model_path=args.model_path, chunk_size=args.chunk_size,
+                                    workers=args.workers)
+    pipeline.run()
@@ -1,22 +1,49 @@
+import io
 import boto3
 from src.configuration.aws_connection import S3Client
-from io import StringIO
-from typing import Union, List
+from src.constants import (S3_METADATA_CACHE_TTL_SECONDS, S3_STREAM_CHUNK_SIZE, S3_TRANSFER_MAX_CONCURRENCY,
+                           S3_TRANSFER_MULTIPART_CHUNK_SIZE_MB, S3_TRANSFER_MULTIPART_THRESHOLD_MB)
+from typing import Dict, Iterator, Optional, TextIO, Tuple, Union
 import os, sys
+import time
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
 from src.logger import logging
 from src.exception import MyException
 from mypy_boto3_s3.service_resource import Bucket
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+import numpy as np
 from pandas import DataFrame, read_csv
 import pickle
 
+
+@dataclass(frozen=True)
+class S3ObjectMetadata:
+    key: str
+    etag: str
+    size: int
+    last_modified: datetime
+
+
 class SimpleStorageServices:
 
     """
     A class for interacting with AWS S3 storage, providing methods for file management,
     data upload, and data retrieval in s3 buckets. 
+
+    Object metadata from HEAD requests is cached process-wide for a short TTL, so repeated
+    existence and freshness checks cost one request or none.
     """
 
+    # (bucket, key) -> (fetched_at, metadata); missing objects are not cached, so an upload shows up at once
+    _metadata_cache: Dict[Tuple[str, str], Tuple[float, S3ObjectMetadata]] = {}
+    _metadata_lock = threading.Lock()
+
     def __init__(self):
         """
         Initialize the SimpleStorageServices instance with s3 resource and client
@@ -31,38 +58,97 @@ class SimpleStorageServices:
     def s3_key_path_available(self, bucket_name, s3_key) -> bool:
 
         """
-        Check if a specified S3 key path (file path) is available in the specified bucket
+        Check if the object with exactly the specified S3 key exists in the specified bucket
         """
 
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=s3_key)]
-            return len(file_objects) > 0
+            return self.get_object_metadata(s3_key, bucket_name) is not None
         
         except Exception as e:
             raise MyException(e, sys)
+
+    def get_object_metadata(self, key: str, bucket_name: str,
+                            max_age: float = S3_METADATA_CACHE_TTL_SECONDS) -> Optional[S3ObjectMetadata]:
+        """
+        Returns the ETag, size and last-modified time of the object with exactly this key,
+        or None when it does not exist. Answers from the metadata cache when it is younger
+        than max_age seconds, otherwise sends a single HEAD request; a missing object is
+        always checked again.
+        """
+        cache_key = (bucket_name, key)
+        now = time.monotonic()
+        cached = self._metadata_cache.get(cache_key)
+        if cached is not None and now - cached[0] < max_age:
+            return cached[1]
+
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=key)
+            metadata = S3ObjectMetadata(key=key, etag=response["ETag"], size=response["ContentLength"],
+                                        last_modified=response["LastModified"])
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                raise MyException(e, sys) from e
+            metadata = None
+
+        with self._metadata_lock:
+            if metadata is None:
+                self._metadata_cache.pop(cache_key, None)
+            else:
+                self._metadata_cache[cache_key] = (now, metadata)
+        return metadata
+
+    @classmethod
+    def invalidate_metadata(cls, key: str, bucket_name: str) -> None:
+        """Drops the cached metadata of an object, e.g. after it was overwritten."""
+        with cls._metadata_lock:
+            cls._metadata_cache.pop((bucket_name, key), None)
         
 
     @staticmethod
-    def read_object(object_name: str, decode:bool = True, make_readable:bool = False) -> Union[StringIO, str]:
+    def read_object(object_name: str, decode:bool = True, make_readable:bool = False) -> Union[TextIO, str, bytes]:
 
         """
         Reads the specified S3 object with optional decoding and formatting. 
+        With make_readable=True a text stream over the body is returned, which is read in
+        chunks as it is consumed instead of being loaded into memory first.
         """
 
         try:
+            if make_readable:
+                return io.TextIOWrapper(SimpleStorageServices.open_object_stream(object_name), encoding="utf-8")
+
             # Read and decode the object content if decode=True
             func = (
                 lambda: object_name.get()["Body"].read().decode()
                 if decode else object_name.get()["Body"].read()
             )
-            # Convert to StringIO if make_readable=True
-            conv_func = lambda: StringIO(func()) if make_readable else func()
             # logging.info("Exited the read_object method of SimpleStorageService class")
-            return conv_func()
+            return func()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def open_object_stream(object_name: object) -> StreamingBody:
+        """
+        Starts a GET of the specified S3 object and returns its body as a binary file-like
+        stream, read from the network as it is consumed.
+        """
+        try:
+            return object_name.get()["Body"]
         except Exception as e:
             raise MyException(e, sys) from e
 
+    @staticmethod
+    def get_transfer_config() -> TransferConfig:
+        """
+        Multipart settings for uploads and downloads: objects above the threshold are
+        transferred as parallel ranged parts.
+        """
+        return TransferConfig(multipart_threshold=S3_TRANSFER_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+                              multipart_chunksize=S3_TRANSFER_MULTIPART_CHUNK_SIZE_MB * 1024 * 1024,
+                              max_concurrency=S3_TRANSFER_MAX_CONCURRENCY,
+                              use_threads=True)
+
     def get_bucket(self, bucket_name: str) -> Bucket:
         """
         Retrieves the S3 bucket object based on the provided bucket name.
@@ -81,25 +167,23 @@ class SimpleStorageServices:
         except Exception as e:
             raise MyException(e, sys) from e
 
-    def get_file_object(self, filename: str, bucket_name: str) -> Union[List[object], object]:
+    def get_file_object(self, filename: str, bucket_name: str) -> object:
         """
-        Retrieves the file object(s) from the specified bucket based on the filename.
+        Retrieves the file object with exactly this key from the specified bucket.
+        No request is sent until the object is read.
 
         Args:
-            filename (str): The name of the file to retrieve.
+            filename (str): The key of the file to retrieve.
             bucket_name (str): The name of the S3 bucket.
 
         Returns:
-            Union[List[object], object]: The S3 file object or list of file objects.
+            object: The S3 file object.
         """
         logging.info("Entered the get_file_object method of SimpleStorageService class")
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=filename)]
-            func = lambda x: x[0] if len(x) == 1 else x
-            file_objs = func(file_objects)
+            file_obj = self.s3_resource.Object(bucket_name, filename)
             logging.info("Exited the get_file_object method of SimpleStorageService class")
-            return file_objs
+            return file_obj
         except Exception as e:
             raise MyException(e, sys) from e
 
@@ -117,14 +201,72 @@ class SimpleStorageServices:
         """
         try:
             model_file = model_dir + "/" + model_name if model_dir else model_name
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            # unpickled from a local file, so the serialized bytes never sit in memory beside the model
+            with tempfile.TemporaryDirectory() as download_dir:
+                download_path = os.path.join(download_dir, os.path.basename(model_file))
+                self.download_file(model_file, bucket_name, download_path)
+                with open(download_path, "rb") as file_obj:
+                    model = pickle.load(file_obj)
             logging.info("Production model loaded from S3 bucket.")
             return model
         except Exception as e:
             raise MyException(e, sys) from e
 
+    def get_object_etag(self, key: str, bucket_name: str, max_age: float = S3_METADATA_CACHE_TTL_SECONDS) -> str:
+        """
+        Returns the ETag of the specified S3 object without downloading its body.
+
+        Args:
+            key (str): Exact key of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            max_age (float): Oldest cached metadata accepted, in seconds; 0 always sends a HEAD request.
+
+        Returns:
+            str: The object's ETag.
+        """
+        try:
+            metadata = self.get_object_metadata(key, bucket_name, max_age=max_age)
+            if metadata is None:
+                raise FileNotFoundError(f"s3://{bucket_name}/{key} does not exist")
+            return metadata.etag
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def download_file(self, key: str, bucket_name: str, to_filename: str) -> None:
+        """
+        Downloads the specified S3 object to a local file, in parallel parts when it is large.
+
+        Args:
+            key (str): Exact key of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            to_filename (str): Local file receiving the object.
+        """
+        try:
+            dir_path = os.path.dirname(to_filename)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            self.s3_client.download_file(bucket_name, key, to_filename, Config=self.get_transfer_config())
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def download_object(self, key: str, bucket_name: str, to_filename: str, etag: str = None) -> None:
+        """
+        Streams the specified S3 object to a local file in chunks, without holding it in memory.
+
+        Args:
+            key (str): Exact key of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            to_filename (str): Local file receiving the object.
+            etag (str): When given, the download fails unless the object still has this ETag.
+        """
+        try:
+            extra_args = {"IfMatch": etag} if etag else {}
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=key, **extra_args)
+            with open(to_filename, "wb") as file_obj:
+                shutil.copyfileobj(response["Body"], file_obj, length=1024 * 1024)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     def create_folder(self, folder_name: str, bucket_name: str) -> None:
         """
         Creates a folder in the specified S3 bucket.
@@ -157,7 +299,9 @@ class SimpleStorageServices:
         logging.info("Entered the upload_file method of SimpleStorageService class")
         try:
             logging.info(f"Uploading {from_filename} to {to_filename} in {bucket_name}")
-            self.s3_resource.meta.client.upload_file(from_filename, bucket_name, to_filename)
+            self.s3_resource.meta.client.upload_file(from_filename, bucket_name, to_filename,
+                                                     Config=self.get_transfer_config())
+            self.invalidate_metadata(to_filename, bucket_name)
             logging.info(f"Uploaded {from_filename} to {to_filename} in {bucket_name}")
 
             # Delete the local file if remove is True
@@ -199,8 +343,8 @@ class SimpleStorageServices:
         """
         logging.info("Entered the get_df_from_object method of SimpleStorageService class")
         try:
-            content = self.read_object(object_, make_readable=True)
-            df = read_csv(content, na_values="na")
+            with self.read_object(object_, make_readable=True) as content:
+                df = read_csv(content, na_values="na")
             logging.info("Exited the get_df_from_object method of SimpleStorageService class")
             return df
         except Exception as e:
@@ -225,3 +369,55 @@ class SimpleStorageServices:
             return df
         except Exception as e:
             raise MyException(e, sys) from e
+
+    def read_csv_chunks(self, filename: str, bucket_name: str, chunksize: int) -> Iterator[DataFrame]:
+        """
+        Streams a CSV file from the specified S3 bucket as DataFrames of chunksize rows,
+        so files larger than memory can be processed.
+
+        Args:
+            filename (str): The name of the file in the bucket.
+            bucket_name (str): The name of the S3 bucket.
+            chunksize (int): Rows per DataFrame.
+        """
+        try:
+            csv_obj = self.get_file_object(filename, bucket_name)
+            with self.read_object(csv_obj, make_readable=True) as content:
+                with read_csv(content, na_values="na", chunksize=chunksize) as reader:
+                    for chunk in reader:
+                        yield chunk
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_numpy_array(self, filename: str, bucket_name: str) -> np.ndarray:
+        """
+        Reads a .npy file from the specified S3 bucket straight into a preallocated array.
+        The body is copied in chunks, so peak memory is the array plus one chunk.
+
+        Args:
+            filename (str): The name of the .npy file in the bucket.
+            bucket_name (str): The name of the S3 bucket.
+        """
+        try:
+            body = self.open_object_stream(self.get_file_object(filename, bucket_name))
+            version = np.lib.format.read_magic(body)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(body)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(body)
+            if dtype.hasobject:
+                raise ValueError(f"{filename} holds Python objects and cannot be streamed")
+
+            array = np.empty(shape, dtype=dtype, order="F" if fortran_order else "C")
+            buffer = memoryview(array.reshape(-1, order="A").view(np.uint8))
+            offset = 0
+            while offset < len(buffer):
+                chunk = body.read(min(S3_STREAM_CHUNK_SIZE, len(buffer) - offset))
+                if not chunk:
+                    raise EOFError(f"{filename} ended after {offset} of {len(buffer)} data bytes")
+                buffer[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+            body.close()
+            return array
+        except Exception as e:
+            raise MyException(e, sys) from e
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import stat
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import joblib
+
+from src.constants import MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES
+from src.exception import MyException
+from src.logger import logging
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where the cache is used by a single process
+    fcntl = None
+
+
+MODEL_FILE_NAME = "model.joblib"
+META_FILE_NAME = "meta.json"
+
+
+class ModelCache:
+
+    """
+    Local disk cache of S3 models, shared by every process on the host.
+
+    Entries are content-addressed by bucket, key and ETag, so a changed object never hits a
+    stale entry. Models are stored with joblib, which writes NumPy arrays uncompressed and
+    aligned; loading with mmap_mode="r" maps them read-only, so worker processes share the
+    page cache instead of each holding its own copy. A per-key "latest" pointer lets a new
+    process serve the last model seen on the host while S3 cannot be reached. When the cache
+    grows past max_bytes, the least recently used entries are evicted.
+
+    Entries are unpickled, so the cache is only used when its directory belongs to the current
+    user and nobody else can write to it; it is created with mode 0700.
+    """
+
+    def __init__(self, cache_dir: str = MODEL_CACHE_DIR, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        """
+        :param cache_dir: Directory holding the entries, created on first use
+        :param max_bytes: Size bound of all entries together, 0 disables the cache
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._private: Optional[bool] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self._is_private()
+
+    def _is_private(self) -> bool:
+        # checked once per process: creates the directory, then refuses it unless it is a real
+        # directory owned by this user that neither the group nor others can write to
+        if self._private is None:
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                status = os.lstat(self.cache_dir)
+                problem = None
+                if not stat.S_ISDIR(status.st_mode):
+                    problem = "is not a directory"
+                elif hasattr(os, "geteuid") and status.st_uid != os.geteuid():
+                    problem = "is owned by another user"
+                elif status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                    problem = f"is writable by other users (mode {stat.S_IMODE(status.st_mode):o})"
+            except OSError as e:
+                problem = f"cannot be created: {e}"
+            if problem is not None:
+                logging.warning(f"Model cache disabled: {self.cache_dir} {problem}; "
+                                f"set MODEL_CACHE_DIR to a directory with mode 0700 owned by the service user")
+            self._private = problem is None
+        return self._private
+
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:32]
+
+    def entry_dir(self, bucket_name: str, key: str, etag: str) -> str:
+        return os.path.join(self.cache_dir, self._digest(bucket_name, key, etag))
+
+    def _latest_path(self, bucket_name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"latest-{self._digest(bucket_name, key)}.json")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # serializes writers and eviction across processes; readers never block
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def staging_file(self) -> Iterator[str]:
+        """
+        Yields a temporary file path inside the cache directory for downloads, removed afterwards.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.cache_dir, prefix=".download-")
+        os.close(fd)
+        try:
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get(self, bucket_name: str, key: str, etag: str) -> Optional[object]:
+        """
+        Returns the cached model memory-mapped, None when it is not cached.
+        """
+        if not self.enabled:
+            return None
+        entry = self.entry_dir(bucket_name, key, etag)
+        try:
+            model = joblib.load(os.path.join(entry, MODEL_FILE_NAME), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable model cache entry {entry}: {e}")
+            return None
+        # the entry's mtime is its last use for LRU eviction
+        os.utime(entry)
+        logging.info(f"Loaded {key} ({etag}) from the model cache {entry}")
+        return model
+
+    def get_latest(self, bucket_name: str, key: str) -> Optional[Tuple[object, str]]:
+        """
+        Returns the most recently cached model of the key and its ETag, without contacting S3.
+        It may be older than the object in S3; callers use it only when S3 cannot be reached.
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(self._latest_path(bucket_name, key)) as latest_file:
+                etag = json.load(latest_file)["etag"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        model = self.get(bucket_name, key, etag)
+        return (model, etag) if model is not None else None
+
+    def put(self, bucket_name: str, key: str, etag: str, model: object) -> object:
+        """
+        Stores the model and returns it reloaded from the cache, memory-mapped.
+        """
+        if not self.enabled:
+            return model
+        try:
+            entry = self.entry_dir(bucket_name, key, etag)
+            with self._locked():
+                if not os.path.isdir(entry):
+                    # written beside the entry and renamed, so readers never see a partial entry
+                    staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".entry-")
+                    try:
+                        joblib.dump(model, os.path.join(staging, MODEL_FILE_NAME))
+                        with open(os.path.join(staging, META_FILE_NAME), "w") as meta_file:
+                            json.dump({"bucket_name": bucket_name, "key": key, "etag": etag,
+                                       "created_at": time.time()}, meta_file)
+                        os.rename(staging, entry)
+                    finally:
+                        shutil.rmtree(staging, ignore_errors=True)
+                    logging.info(f"Cached {key} ({etag}) in {entry}")
+
+                latest_path = self._latest_path(bucket_name, key)
+                with open(latest_path + ".tmp", "w") as latest_file:
+                    json.dump({"etag": etag}, latest_file)
+                os.replace(latest_path + ".tmp", latest_path)
+
+                self._evict(keep=entry)
+
+            cached = self.get(bucket_name, key, etag)
+            return cached if cached is not None else model
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def _entry_size(entry: str) -> int:
+        return sum(entry_file.stat().st_size for entry_file in os.scandir(entry) if entry_file.is_file())
+
+    def _evict(self, keep: str) -> None:
+        # Called with the lock held. Unlinking an entry another process has mapped is safe:
+        # its pages stay valid until that process unmaps them.
+        entries = [entry.path for entry in os.scandir(self.cache_dir)
+                   if entry.is_dir() and not entry.name.startswith(".")]
+        entries.sort(key=os.path.getmtime)
+        total = sum(self._entry_size(entry) for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            size = self._entry_size(entry)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted {entry} from the model cache")
@@ -1,14 +1,19 @@
 import os 
 import sys 
+import time
+from collections import Counter
 
-import pandas as pd 
-from sklearn.model_selection import train_test_split
+import numpy as np
 
 from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.exception import MyException
 from src.logger import logging
-from src.data_access.vehical_data import VehicleData
+from src.data_access.vehical_data import VehicleData, object_id_before
+from src.data_access.feature_store import (FeatureStoreWriter, IncrementalFeatureStore, iter_feature_store,
+                                           merge_shards, schema_column_types, write_feature_store)
+from src.constants import DATA_INGESTION_SHARD_MANIFEST_NAME, TARGET_COLUMN
+from src.utils.main_utils import hash_fractions, read_yaml_file
 
 
 class DataIngestion:
@@ -16,53 +21,179 @@ class DataIngestion:
 
         try:
             self.data_ingestion_config = data_ingestion_config
+            self._schema_config = read_yaml_file(file_path=data_ingestion_config.schema_file_path)
         except Exception as e:
             raise MyException(e, sys)
         
-    def export_data_into_feature_store(self) -> pd.DataFrame:
+    def export_data_into_feature_store(self) -> None:
 
         """
         Method Name: export data into feature store
-        Description : This method exports data from mongodb to csv file
+        Description : This method streams the schema columns from mongodb to the feature store file
+                      in batches of export_batch_size documents
 
 
-        output : data is returned as artifact of data ingestion components
+        output : the feature store file at feature_store_file_path
         On failure : write an exception log and then raise an exception 
         """
 
         try: 
             logging.info(f"Export data from mongoDB")
-            my_data = VehicleData()
-            data_frame = my_data.export_collection_as_dataframe(collection_name=
-                                                                self.data_ingestion_config.collection_name)
-            logging.info(f"Shape of dataframe: {data_frame.shape}")
+            column_types = schema_column_types(self._schema_config)
+
             feature_store_file_path  = self.data_ingestion_config.feature_store_file_path
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
-            data_frame.to_csv(feature_store_file_path, index=False, header=True)
-            return data_frame
+            if self.data_ingestion_config.incremental:
+                self.export_incremental()
+            elif self.data_ingestion_config.export_workers > 1:
+                self.export_parallel()
+            else:
+                my_data = VehicleData()
+                chunks = my_data.iter_collection_chunks(collection_name=self.data_ingestion_config.collection_name,
+                                                        columns=list(column_types),
+                                                        column_types=column_types,
+                                                        batch_size=self.data_ingestion_config.export_batch_size)
+                logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
+                rows = write_feature_store(chunks, feature_store_file_path, schema=self._schema_config)
+                logging.info(f"Exported {rows} rows in batches of {self.data_ingestion_config.export_batch_size}")
         
         except Exception as e:
             raise MyException(e, sys)
         
 
-    def split_data_as_train_test(self, dataframe:pd.DataFrame) -> None : 
+    def export_incremental(self) -> None:
 
+        """
+        Method Name: export incremental
+        Description : Appends the documents inserted since the last export to the persistent feature store,
+                      compacting it once it has more than compact_partitions partitions, then writes the
+                      whole store, without duplicates of dedupe_columns, into this run's feature store file.
+                      Documents from watermark_lookback_seconds before the _id high-water mark are fetched
+                      again, since client-generated ObjectIds do not follow commit order.
+        """
 
-        try: 
-            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio)
-            logging.info("Performed train test split on the dataframe")
-            logging.info("Exited split_data_as_train_test method of Data_Ingestion class")
+        try:
+            config = self.data_ingestion_config
+            column_types = schema_column_types(self._schema_config)
+            store = IncrementalFeatureStore(config.incremental_store_dir, schema=self._schema_config)
+            with store.locked():
+                watermark = store.watermark
+                after_id = (object_id_before(watermark, config.watermark_lookback_seconds)
+                            if watermark is not None else None)
+                logging.info(f"Incremental export of documents after {after_id} (high-water mark {watermark}) "
+                             f"into {config.incremental_store_dir}")
+                chunks = VehicleData().iter_collection_chunks(collection_name=config.collection_name,
+                                                              columns=list(column_types),
+                                                              column_types=column_types,
+                                                              batch_size=config.export_batch_size,
+                                                              after_id=after_id,
+                                                              include_id=True)
+                rows = store.append(chunks)
+                logging.info(f"Exported {rows} new rows")
+
+                if len(store.partition_paths) > config.compact_partitions:
+                    store.compact(dedupe_columns=config.dedupe_columns)
+                store.export(config.feature_store_file_path, dedupe_columns=config.dedupe_columns)
 
-            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-            os.makedirs(dir_path, exist_ok=True)
+        except Exception as e:
+            raise MyException(e, sys) from e
 
-            logging.info(f"Exporting train and test file path")
-            train_set.to_csv(self.data_ingestion_config.training_file_path, index= False, header = True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path, index= False, header = True)
+    def export_parallel(self) -> None:
+
+        """
+        Method Name: export parallel
+        Description : Exports the collection in export_workers _id ranges, each drained into its own shard
+                      by its own process, then merges the shards and their manifest into the feature store
+        """
+
+        try:
+            config = self.data_ingestion_config
+            column_types = schema_column_types(self._schema_config)
+            start = time.perf_counter()
+            manifest = VehicleData().export_collection_in_parallel(collection_name=config.collection_name,
+                                                                   shard_dir=config.shard_dir,
+                                                                   workers=config.export_workers,
+                                                                   columns=list(column_types),
+                                                                   column_types=column_types,
+                                                                   batch_size=config.export_batch_size,
+                                                                   schema=self._schema_config)
+            rows = merge_shards(manifest, config.feature_store_file_path,
+                                manifest_path=os.path.join(config.shard_dir, DATA_INGESTION_SHARD_MANIFEST_NAME))
+            elapsed = time.perf_counter() - start
+            logging.info(f"Exported {rows} rows with {len(manifest)} workers in {elapsed:.1f}s "
+                         f"({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def stratified_thresholds(self) -> dict:
 
-            logging.info(f"Exported train and test file path")
+        """
+        Method Name: stratified thresholds
+        Description : Reads only the id and target columns of the feature store and returns, for each
+                      target class, the hash fraction below which exactly train_test_split_ratio of the
+                      class goes to the test split. The thresholds are quantiles of the current data, so
+                      new rows move them slightly and the rows next to a threshold can change sides.
+        """
+
+        try:
+            config = self.data_ingestion_config
+            fractions, labels = [], []
+            for chunk in iter_feature_store(config.feature_store_file_path,
+                                            columns=[config.split_id_column, TARGET_COLUMN],
+                                            batch_size=config.export_batch_size):
+                fractions.append(hash_fractions(chunk[config.split_id_column], salt=config.split_salt))
+                labels.append(chunk[TARGET_COLUMN].to_numpy())
+            fractions, labels = np.concatenate(fractions), np.concatenate(labels)
+
+            thresholds = {}
+            for label in np.unique(labels):
+                class_fractions = fractions[labels == label]
+                n_test = int(round(config.train_test_split_ratio * len(class_fractions)))
+                thresholds[label] = (np.partition(class_fractions, n_test)[n_test]
+                                     if n_test < len(class_fractions) else 1.0)
+            return thresholds
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def split_data_as_train_test(self) -> None : 
+
+        """
+        Method Name: split data as train test
+        Description : Streams the feature store chunk by chunk into the train and test files. A row goes
+                      to the test file when the hash fraction of its id is below train_test_split_ratio,
+                      so the split is the same on every run and a customer keeps its side as new data is
+                      ingested. The hash does not depend on the target, so each target class is split in
+                      the ratio up to sampling noise; the test share per class is logged.
+                      With split_stratify, each class is cut at its own threshold instead (see
+                      stratified_thresholds), trading that cross-run stability for exact class ratios.
+        """
+
+        try: 
+            config = self.data_ingestion_config
+            thresholds = self.stratified_thresholds() if config.split_stratify else None
+            class_rows, class_test_rows = Counter(), Counter()
+
+            logging.info(f"Exporting train and test file path")
+            with FeatureStoreWriter(config.training_file_path, schema=self._schema_config) as train_writer, \
+                    FeatureStoreWriter(config.testing_file_path, schema=self._schema_config) as test_writer:
+                for chunk in iter_feature_store(config.feature_store_file_path, batch_size=config.export_batch_size):
+                    fractions = hash_fractions(chunk[config.split_id_column], salt=config.split_salt)
+                    if thresholds is None:
+                        is_test = fractions < config.train_test_split_ratio
+                    else:
+                        is_test = fractions < chunk[TARGET_COLUMN].map(thresholds).to_numpy(dtype=np.float64)
+                    train_writer.write(chunk[~is_test])
+                    test_writer.write(chunk[is_test])
+                    if TARGET_COLUMN in chunk.columns:
+                        class_rows.update(chunk[TARGET_COLUMN].value_counts().to_dict())
+                        class_test_rows.update(chunk[TARGET_COLUMN][is_test].value_counts().to_dict())
+
+            test_shares = {label: round(class_test_rows[label] / rows, 4) for label, rows in class_rows.items()}
+            logging.info(f"Performed {'stratified ' if thresholds is not None else ''}hash train test split: "
+                         f"{train_writer.rows} train and {test_writer.rows} test rows, "
+                         f"test share per {TARGET_COLUMN} class {test_shares}")
+            logging.info("Exited split_data_as_train_test method of Data_Ingestion class")
 
         except Exception as e:
             raise MyException(e,sys) from e
@@ -73,10 +204,10 @@ class DataIngestion:
         """
 
         try: 
-            dataframe = self.export_data_into_feature_store()
+            self.export_data_into_feature_store()
 
             logging.info("Got the data from mongodb")
-            self.split_data_as_train_test(dataframe)
+            self.split_data_as_train_test()
 
             logging.info("Performed train test split on the dataset")
 
@@ -13,6 +13,7 @@ from src.entity.artifact_entity import(DataIngestionArtifact,
                                        DataTransformationArtifact)
 from src.exception import MyException
 from src.logger import logging
+from src.data_access.feature_store import load_feature_store
 from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file
 
 
@@ -33,10 +34,10 @@ class DataTransformation:
             raise MyException(e, sys)
         
 
-    @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(self, file_path) -> pd.DataFrame:
+        """Reads a feature store file with the narrowest safe dtypes of the schema."""
         try:
-            return pd.read_csv(file_path)
+            return load_feature_store(file_path, schema=self._schema_config, stage="data_transformation")
         except Exception as e:
             raise MyException(e, sys)
         
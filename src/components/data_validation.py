@@ -6,6 +6,7 @@ import pandas as pd
 
 from src.exception import MyException
 from src.logger import logging
+from src.data_access.feature_store import load_feature_store
 from src.utils.main_utils import read_yaml_file
 from src.entity.config_entity import  DataValidationConfig
 from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
@@ -73,10 +74,10 @@ class DataVlidation:
             raise MyException(e,sys) from e 
         
 
-    @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(self, file_path) -> pd.DataFrame:
+        """Reads a feature store file with the narrowest safe dtypes of the schema."""
         try:
-            return pd.read_csv(file_path)
+            return load_feature_store(file_path, schema=self._schema_config, stage="data_validation")
         except Exception as e:
             raise MyException(e,sys)
         
@@ -87,8 +88,8 @@ class DataVlidation:
         try:
             validation_error_msg = ""
             logging.info("Starting data validation")
-            train_df, test_df = (DataVlidation.read_data(file_path=self.data_ingestion_artifact.trained_file_path),
-                                 DataVlidation.read_data(file_path=self.data_ingestion_artifact.test_file_path))
+            train_df, test_df = (self.read_data(file_path=self.data_ingestion_artifact.trained_file_path),
+                                 self.read_data(file_path=self.data_ingestion_artifact.test_file_path))
             
             status = self.validate_number_of_columns(dataframe=train_df)
             if not status: 
@@ -3,6 +3,7 @@ from src.entity.artifact_entity import ModelEvaluationArtifact, DataIngestionArt
 from sklearn.metrics import f1_score
 from src.exception import MyException
 from src.logger import logging
+from src.data_access.feature_store import load_feature_store
 from src.utils.main_utils import load_object
 import sys
 import pandas as pd 
@@ -101,7 +102,8 @@ class ModelEvaluation:
         """
 
         try: 
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            test_df = load_feature_store(self.data_ingestion_artifact.test_file_path, schema=self._schema_config,
+                                         stage="model_evaluation")
             x,y = test_df.drop(columns=[TARGET_COLUMN], axis=1), test_df[TARGET_COLUMN]
 
             logging.info("Test data loaded and now transforming it fir prediction...")
@@ -148,6 +150,7 @@ class ModelEvaluation:
                 is_model_accepted=evaluate_mode_response.is_model_accepted,
                 s3_model_path=s3_model_path,
                 trained_model_path=self.model_trainer_artifact.trained_model_file_path,
+                trained_model_bundle_path=self.model_trainer_artifact.trained_model_bundle_file_path,
                 changed_accuracy=evaluate_mode_response.difference
             )
 
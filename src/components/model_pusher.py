@@ -1,3 +1,4 @@
+import os
 import sys 
 
 from src.cloud_storage.aws_storage import SimpleStorageServices
@@ -29,6 +30,12 @@ class ModelPusher:
 
             logging.info("Uploading new model to s3 bucker....")
             self.vehicle_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
+
+            bundle_path = self.model_evaluation_artifact.trained_model_bundle_path
+            if bundle_path and os.path.exists(bundle_path):
+                logging.info("Uploading new model bundle to s3 bucket....")
+                self.s3.upload_file(bundle_path, to_filename=self.model_pusher_config.s3_model_bundle_key_path,
+                                    bucket_name=self.model_pusher_config.bucket_name, remove=False)
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
                                                         s3_model_path=self.model_pusher_config.s3_model_key_path)
             
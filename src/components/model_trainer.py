@@ -1,16 +1,22 @@
 import sys 
-from typing import Tuple
+import copy
+import time
+from typing import List, Tuple
 
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.utils import check_random_state
 
 from src.exception import MyException
 from src.logger import logging
-from src.utils.main_utils import load_numpy_array_data, load_object, save_object
+from src.utils.main_utils import load_numpy_array_data, load_object, save_object, write_yaml_file
 from src.entity.config_entity import ModelTrainerConfig
 from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
 from src.entity.estimator import MyModel
+from src.entity.model_bundle import save_bundle
+from src.entity.tree_engine import FlatForest
+from src.constants import MODEL_TRAINER_COMPRESSION_LATENCY_BATCH_SIZE
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact, model_trainer_config:ModelTrainerConfig):
@@ -47,6 +53,9 @@ class ModelTrainer:
             model.fit(x_train, y_train)
             logging.info("Model training done.")
 
+            if self.model_trainer_config.compress_forest:
+                model = self.compress_forest(model, x_train, y_train, x_test=x_test, y_test=y_test)
+
             # prediction and evaluate metrics
             y_pred = model.predict(x_test)
             accuracy = accuracy_score(y_test,y_pred)
@@ -61,6 +70,110 @@ class ModelTrainer:
         except Exception as e:
             raise MyException(e, sys) from e
         
+    @staticmethod
+    def _subset_forest(model: RandomForestClassifier, tree_indices: List[int]) -> RandomForestClassifier:
+        # a shallow copy shares the fitted trees, only the list of estimators differs
+        subset = copy.copy(model)
+        subset.estimators_ = [model.estimators_[i] for i in tree_indices]
+        subset.n_estimators = len(subset.estimators_)
+        return subset
+
+    @staticmethod
+    def _latency_ms(engine: FlatForest, x: np.ndarray, repeats: int = 5) -> float:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            engine.predict(x)
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    @staticmethod
+    def _out_of_bag_mask(model: RandomForestClassifier, tree, n_samples: int) -> np.ndarray:
+        # redraws the tree's bootstrap sample from its seed, the way scikit-learn's own oob_score does
+        if model.max_samples is None:
+            n_bootstrap = n_samples
+        elif isinstance(model.max_samples, int):
+            n_bootstrap = model.max_samples
+        else:
+            n_bootstrap = max(round(n_samples * model.max_samples), 1)
+        drawn = check_random_state(tree.random_state).randint(0, n_samples, n_bootstrap)
+        return np.bincount(drawn, minlength=n_samples) == 0
+
+    def compress_forest(self, model: RandomForestClassifier, x_train: np.ndarray, y_train: np.ndarray,
+                        x_test: np.ndarray = None, y_test: np.ndarray = None) -> RandomForestClassifier:
+
+        """
+        Description: Searches for the smallest subset of trees whose out-of-bag F1 stays within
+                     compression_f1_tolerance of the full forest's, so the forest is fitted on every
+                     training row and nothing is held out. Each tree is ranked by its F1 on the rows
+                     left out of its bootstrap sample; the candidates are prefixes of that ranking,
+                     every compression_step trees, each scored like oob_score on the rows that are out
+                     of bag for at least one of its trees. The F1 and serving latency of every candidate
+                     are written to the compression report, with the test F1 of the full and the
+                     compressed forest when test data is given; the test data plays no part in the selection.
+        Output: Returns the compressed forest, or the full forest when no smaller subset qualifies
+        """
+
+        try:
+            config = self.model_trainer_config
+            if not model.bootstrap:
+                raise ValueError("Forest compression needs a forest fitted with bootstrap=True")
+            n_trees, n_samples = len(model.estimators_), len(y_train)
+
+            # trees are fitted on class indices, their probabilities map back through the forest's classes_
+            masks, tree_proba, tree_f1 = [], [], []
+            for tree in model.estimators_:
+                mask = self._out_of_bag_mask(model, tree, n_samples)
+                proba = tree.predict_proba(x_train[mask])
+                masks.append(mask)
+                tree_proba.append(proba)
+                tree_f1.append(f1_score(y_train[mask], model.classes_.take(np.argmax(proba, axis=1))))
+            order = [int(i) for i in np.argsort(tree_f1, kind="stable")[::-1]]
+
+            sizes = sorted(set(range(config.compression_step, n_trees, config.compression_step)) | {n_trees})
+            single_row, batch = x_train[:1], x_train[:MODEL_TRAINER_COMPRESSION_LATENCY_BATCH_SIZE]
+            proba_sum = np.zeros((n_samples, len(model.classes_)))
+            n_votes = np.zeros(n_samples, dtype=np.int64)
+            curve = []
+            for n_used, tree_index in enumerate(order, start=1):
+                proba_sum[masks[tree_index]] += tree_proba[tree_index]
+                n_votes[masks[tree_index]] += 1
+                if n_used not in sizes:
+                    continue
+                scored = n_votes > 0
+                f1 = f1_score(y_train[scored], model.classes_.take(np.argmax(proba_sum[scored], axis=1)))
+                engine = FlatForest.from_sklearn(self._subset_forest(model, order[:n_used]))
+                curve.append({"n_trees": n_used, "f1_score": float(f1), "oob_rows": int(scored.sum()),
+                              "node_count": int(engine.node_count),
+                              "single_row_ms": self._latency_ms(engine, single_row),
+                              "batch_ms": self._latency_ms(engine, batch)})
+
+            full_f1 = curve[-1]["f1_score"]
+            selected = n_trees
+            for point in curve:
+                point["f1_drop"] = float(full_f1 - point["f1_score"])
+                if selected == n_trees and point["f1_score"] >= full_f1 - config.compression_f1_tolerance:
+                    selected = point["n_trees"]
+
+            compressed = model if selected == n_trees else self._subset_forest(model, order[:selected])
+            report = {
+                "full_oob_f1_score": float(full_f1),
+                "f1_tolerance": config.compression_f1_tolerance,
+                "latency_batch_size": len(batch),
+                "selected_n_trees": selected,
+                "curve": curve,
+            }
+            if x_test is not None:
+                report["test_f1_score"] = {"full": float(f1_score(y_test, model.predict(x_test))),
+                                           "compressed": float(f1_score(y_test, compressed.predict(x_test)))}
+            write_yaml_file(config.compression_report_file_path, report)
+            logging.info(f"Forest compression: {selected} of {n_trees} trees kept, "
+                         f"report written to {config.compression_report_file_path}")
+            return compressed
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     def initiate_model_trainer(self)  -> ModelTrainerArtifact:
         logging.info("Entered initiate_model_trainer method of Model Trainer")
 
@@ -88,14 +201,30 @@ class ModelTrainer:
             # Save the final model object that includes both preprocessing and the trained model
             logging.info("Saving new model as performance is batter than previous one.")
             my_model = MyModel(preprocessing_object=preprocessing_obj, trained_model_object=trained_model)
+            # ship the flattened forest with the model so serving does not have to compile it
+            my_model.get_tree_engine()
             save_object(self.model_trainer_config.trained_model_file_path, my_model)
             logging.info("Saved final model obj that includes both preprocessing and the trained model")
 
+            # the compact bundle is what serving loads; models it cannot represent are served from the pickle
+            bundle_file_path = None
+            if my_model.get_inference_plan() is not None and my_model.get_tree_engine() is not None:
+                bundle_file_path = save_bundle(my_model, self.model_trainer_config.trained_model_bundle_file_path,
+                                               compress=self.model_trainer_config.compress_model_bundle,
+                                               metadata={"f1_score": metric_artifact.f1_score,
+                                                         "precision_score": metric_artifact.precision_score,
+                                                         "recall_score": metric_artifact.recall_score})
+            else:
+                logging.warning("Model cannot be bundled; only the pickle was saved")
+
 
             # Create and return the ModelTrainerArtifact
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
-                metric_artifact=metric_artifact
+                metric_artifact=metric_artifact,
+                trained_model_bundle_file_path=bundle_file_path,
+                compression_report_file_path=(self.model_trainer_config.compression_report_file_path
+                                              if self.model_trainer_config.compress_forest else None)
             )
 
             logging.info(f"Model trainer artifact: {model_trainer_artifact}")
@@ -11,15 +11,27 @@ PIPELINE_NAME: str = ""
 ARTIFACT_DIR : str = "artifact"
 
 MODEL_FILE_NAME = "model.pkl"
+# Compact array bundle written and pushed beside the pickle; served when the key ends with the extension
+MODEL_BUNDLE_FILE_EXTENSION = ".bundle"
+MODEL_BUNDLE_FILE_NAME = "model" + MODEL_BUNDLE_FILE_EXTENSION
+MODEL_BUNDLE_ALIGNMENT: int = 64
+MODEL_BUNDLE_COMPRESS: bool = os.getenv("MODEL_BUNDLE_COMPRESS", "0") == "1"
+# S3 key the serving app loads. The pickle by default, since buckets pushed before the bundle format
+# only hold model.pkl; set MODEL_SERVING_FILE_NAME=model.bundle once a bundle has been pushed.
+MODEL_SERVING_FILE_NAME: str = os.getenv("MODEL_SERVING_FILE_NAME", MODEL_FILE_NAME)
 PREPROCESSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
 TARGET_COLUMN = "Response"
 CURRENT_YEAR = date.today().year
 
 
-FILE_NAME:str = "data.csv"
-TRAIN_FILE_NAME:str = "train.csv"
-TEST_FILE_NAME :str = "test.csv"
+# feature store files are written as typed Parquet by default, FEATURE_STORE_FILE_FORMAT=csv writes text
+FEATURE_STORE_FILE_FORMAT: str = os.getenv("FEATURE_STORE_FILE_FORMAT", "parquet")
+FEATURE_STORE_ROW_GROUP_SIZE: int = 65536
+FEATURE_STORE_COMPRESSION: str = "zstd"
+FILE_NAME:str = f"data.{FEATURE_STORE_FILE_FORMAT}"
+TRAIN_FILE_NAME:str = f"train.{FEATURE_STORE_FILE_FORMAT}"
+TEST_FILE_NAME :str = f"test.{FEATURE_STORE_FILE_FORMAT}"
 SCHEMA_FILE_PATH = os.path.join("config","schema.yaml")
 
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
@@ -35,6 +47,28 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str  = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATION: float = 0.25
+DATA_INGESTION_EXPORT_BATCH_SIZE: int = int(os.getenv("DATA_INGESTION_EXPORT_BATCH_SIZE", 10000))
+# incremental mode: only documents inserted since the last run are exported into a persistent store
+DATA_INGESTION_INCREMENTAL: bool = os.getenv("DATA_INGESTION_INCREMENTAL", "0") == "1"
+DATA_INGESTION_INCREMENTAL_STORE_DIR: str = os.getenv("DATA_INGESTION_INCREMENTAL_STORE_DIR",
+                                                      os.path.join("feature_store", DATA_INGESTION_COLLECTION_NAME))
+DATA_INGESTION_COMPACT_PARTITIONS: int = 30
+# ObjectIds are generated by the clients with second resolution and skewed clocks, so a document
+# can commit after the export with a smaller _id than the high-water mark; each incremental export
+# re-reads this many seconds before the mark and the duplicates are dropped by DEDUPE_COLUMNS
+DATA_INGESTION_WATERMARK_LOOKBACK_SECONDS: int = int(os.getenv("DATA_INGESTION_WATERMARK_LOOKBACK_SECONDS", 300))
+DATA_INGESTION_DEDUPE_COLUMNS = ["id"]
+# parallel export: the collection is split into this many _id ranges, each drained by its own process
+DATA_INGESTION_EXPORT_WORKERS: int = int(os.getenv("DATA_INGESTION_EXPORT_WORKERS", 1))
+DATA_INGESTION_SAMPLES_PER_RANGE: int = 100
+DATA_INGESTION_SHARD_DIR: str = "shards"
+DATA_INGESTION_SHARD_MANIFEST_NAME: str = "manifest.json"
+# rows go to the test split by a hash of the id column, so a customer keeps its side across runs
+DATA_INGESTION_SPLIT_ID_COLUMN: str = "id"
+DATA_INGESTION_SPLIT_SALT: str = os.getenv("DATA_INGESTION_SPLIT_SALT", "vehicle-insurance")
+# DATA_INGESTION_SPLIT_STRATIFY=1 gives each TARGET_COLUMN class exactly the split ratio, by cutting each class
+# at its own quantile of the hash fractions; the cutoffs follow the data, so rows near them can change sides between runs
+DATA_INGESTION_SPLIT_STRATIFY: bool = os.getenv("DATA_INGESTION_SPLIT_STRATIFY", "0") == "1"
 
 
 """
@@ -68,6 +102,13 @@ MODEL_TRAINER_MIN_SAMPLES_LEAF: int = 6
 MIN_SAMPLES_SPLIT_MAX_DEPTH: int = 10
 MIN_SAMPLES_SPLIT_CRITERION: str = 'entropy'
 MIN_SAMPLES_SPLIT_RANDOM_STATE:int = 101
+# opt-in post-training forest compression: the smallest subset of trees whose out-of-bag F1 is
+# within the tolerance of the full forest is deployed
+MODEL_TRAINER_COMPRESS_FOREST: bool = os.getenv("MODEL_TRAINER_COMPRESS_FOREST", "0") == "1"
+MODEL_TRAINER_COMPRESSION_F1_TOLERANCE: float = 0.005
+MODEL_TRAINER_COMPRESSION_STEP: int = 10
+MODEL_TRAINER_COMPRESSION_LATENCY_BATCH_SIZE: int = 256
+MODEL_TRAINER_COMPRESSION_REPORT_NAME: str = "forest_compression_report.yaml"
 
 
 """
@@ -76,7 +117,79 @@ Model Evaluation
 
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE:float = 0.02
 MODEL_BUCKET_NAME = "mlopsvehicleinsurance12"
+# Multipart transfers: objects above the threshold move in parallel parts of the chunk size
+S3_TRANSFER_MULTIPART_THRESHOLD_MB: int = int(os.getenv("S3_TRANSFER_MULTIPART_THRESHOLD_MB", 64))
+S3_TRANSFER_MULTIPART_CHUNK_SIZE_MB: int = int(os.getenv("S3_TRANSFER_MULTIPART_CHUNK_SIZE_MB", 16))
+S3_TRANSFER_MAX_CONCURRENCY: int = int(os.getenv("S3_TRANSFER_MAX_CONCURRENCY", 10))
+# Bytes read from an S3 body at a time when streaming it into pandas or NumPy
+S3_STREAM_CHUNK_SIZE: int = 1024 * 1024
+# Seconds S3 object metadata (ETag, size, last-modified) from HEAD requests is reused
+S3_METADATA_CACHE_TTL_SECONDS: float = float(os.getenv("S3_METADATA_CACHE_TTL_SECONDS", 30))
 MODEL_PUSHER_S3_KEY = "model-registry"
 
+"""
+Training jobs
+"""
+TRAINING_JOB_HISTORY_SIZE: int = 50
+
+
+"""
+Batch scoring
+"""
+BATCH_SCORING_CHUNK_SIZE: int = 50000
+BATCH_SCORING_WORKERS: int = os.cpu_count() or 1
+
+
+"""
+Prediction / serving
+"""
+MODEL_REFRESH_INTERVAL_SECONDS: int = 60
+# Local disk cache of S3 models shared by the worker processes of a host, 0 bytes disables it.
+# Cached models are unpickled, so the directory must be private to the service user (mode 0700);
+# it defaults to the user's cache directory and the cache is disabled if anyone else can write to it
+MODEL_CACHE_DIR: str = os.getenv("MODEL_CACHE_DIR", os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "vehicle-insurance", "model-cache"))
+MODEL_CACHE_MAX_BYTES: int = int(os.getenv("MODEL_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+PREDICTION_BATCH_MAX_RECORDS: int = 10000
+PREDICTION_BATCH_MAX_WAIT_MS: float = float(os.getenv("PREDICTION_BATCH_MAX_WAIT_MS", 5))
+PREDICTION_BATCH_MAX_SIZE: int = int(os.getenv("PREDICTION_BATCH_MAX_SIZE", 64))
+# "thread" or "process" pool that runs inference off the event loop
+PREDICTION_EXECUTOR_MODE: str = os.getenv("PREDICTION_EXECUTOR_MODE", "thread")
+PREDICTION_EXECUTOR_WORKERS: int = int(os.getenv("PREDICTION_EXECUTOR_WORKERS", 4))
+# Batches up to this many rows use the flattened tree engine, larger ones scikit-learn's C traversal
+PREDICTION_TREE_ENGINE_MAX_ROWS: int = int(os.getenv("PREDICTION_TREE_ENGINE_MAX_ROWS", 1024))
+# Entries of the in-process prediction cache keyed on the feature vector. Off (0) by default since
+# it keeps customer feature vectors in memory; set PREDICTION_CACHE_SIZE to opt in
+PREDICTION_CACHE_SIZE: int = int(os.getenv("PREDICTION_CACHE_SIZE", 0))
+# Seconds between startup warm-up attempts while the model cannot be loaded
+PREDICTION_WARMUP_RETRY_SECONDS: float = float(os.getenv("PREDICTION_WARMUP_RETRY_SECONDS", 10))
+PREDICTION_FEATURE_COLUMNS = [
+    "Gender",
+    "Age",
+    "Driving_License",
+    "Region_Code",
+    "Previously_Insured",
+    "Annual_Premium",
+    "Policy_Sales_Channel",
+    "Vintage",
+    "Vehicle_Age_lt_1_Year",
+    "Vehicle_Age_gt_2_Years",
+    "Vehicle_Damage_Yes",
+]
+# Representative record scored once per worker at startup, before the readiness check passes
+PREDICTION_WARMUP_RECORD = {
+    "Gender": 1,
+    "Age": 35,
+    "Driving_License": 1,
+    "Region_Code": 28.0,
+    "Previously_Insured": 0,
+    "Annual_Premium": 30000.0,
+    "Policy_Sales_Channel": 26.0,
+    "Vintage": 150,
+    "Vehicle_Age_lt_1_Year": 0,
+    "Vehicle_Age_gt_2_Years": 0,
+    "Vehicle_Damage_Yes": 1,
+}
+
 APP_HOST = "0.0.0.0"
 APP_PORT = 8000
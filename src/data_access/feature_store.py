@@ -0,0 +1,457 @@
+import os
+import sys
+import json
+import time
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.constants import FEATURE_STORE_COMPRESSION, FEATURE_STORE_FILE_FORMAT, FEATURE_STORE_ROW_GROUP_SIZE
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import downcast_numeric_columns
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where a single ingestion runs at a time
+    fcntl = None
+
+
+STATE_FILE_NAME = "_state.json"
+
+
+def is_parquet(file_path: str) -> bool:
+    return file_path.endswith(".parquet")
+
+
+def schema_column_types(schema: dict) -> Dict[str, str]:
+    """Column name to type ('int', 'float' or 'category') of the columns: section of schema.yaml."""
+    return {name: column_type for column in schema["columns"] for name, column_type in column.items()}
+
+
+def apply_schema_dtypes(dataframe: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Casts the schema columns of the dataframe to their schema types: int64 (float64 when values
+    are missing), float64, and categoricals with the sorted categories listed in the schema, so
+    every chunk and every file of the feature store shares the same dictionary.
+    Raises ValueError on a category value the schema does not list.
+    """
+    categories = schema.get("categories", {})
+    dtypes = {}
+    for column, column_type in schema_column_types(schema).items():
+        if column not in dataframe.columns:
+            continue
+        values = dataframe[column]
+        if column_type == "category" and column in categories:
+            dtype = pd.CategoricalDtype(categories[column])
+            if values.dtype != dtype:
+                unknown = set(values.dropna().unique()) - set(categories[column])
+                if unknown:
+                    raise ValueError(f"Values {sorted(map(str, unknown))} of {column} are not in the schema categories")
+                dtypes[column] = dtype
+        elif column_type == "int" and values.dtype.kind not in "iu":
+            dtypes[column] = "float64" if values.isna().any() else "int64"
+        elif column_type == "float" and values.dtype.kind != "f":
+            dtypes[column] = "float64"
+    return dataframe.astype(dtypes) if dtypes else dataframe
+
+
+def arrow_schema(schema: dict, columns: List[str]):
+    """Arrow schema of the given columns; ints are nullable int64 and categoricals are dictionary encoded."""
+    import pyarrow as pa
+
+    types = {"int": pa.int64(), "float": pa.float64(), "category": pa.dictionary(pa.int32(), pa.string())}
+    column_types = schema_column_types(schema)
+    return pa.schema([(column, types.get(column_types.get(column), pa.string())) for column in columns])
+
+
+def read_feature_store(file_path: str, columns: Optional[List[str]] = None,
+                       filters: Optional[list] = None) -> pd.DataFrame:
+    """
+    Reads a feature store file. For Parquet, only the given columns are read and row groups whose
+    statistics cannot match the filters (pyarrow filters, e.g. [("Age", ">", 60)]) are skipped.
+    CSV files support the column projection only.
+    """
+    try:
+        if is_parquet(file_path):
+            return pd.read_parquet(file_path, columns=columns, filters=filters)
+        if filters:
+            raise ValueError("Filters are only supported on Parquet feature store files")
+        return pd.read_csv(file_path, usecols=columns)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def iter_feature_store(file_path: str, columns: Optional[List[str]] = None,
+                       batch_size: int = FEATURE_STORE_ROW_GROUP_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yields the feature store file in DataFrames of at most batch_size rows, reading only the
+    given columns, so a file larger than memory can be processed chunk by chunk.
+    """
+    try:
+        if is_parquet(file_path):
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(file_path)
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(file_path, usecols=columns, chunksize=batch_size)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def load_feature_store(file_path: str, schema: dict, stage: str, columns: Optional[List[str]] = None,
+                       filters: Optional[list] = None) -> pd.DataFrame:
+    """
+    Reads a feature store file with the narrowest safe dtypes for the schema: schema categoricals
+    and downcast int columns (see downcast_numeric_columns). Logs the memory of the frame as
+    read and after downcasting under the given pipeline stage.
+    """
+    try:
+        dataframe = read_feature_store(file_path, columns=columns, filters=filters)
+        before = dataframe.memory_usage(deep=True).sum()
+        dataframe = downcast_numeric_columns(apply_schema_dtypes(dataframe, schema), schema_column_types(schema))
+        after = dataframe.memory_usage(deep=True).sum()
+        logging.info(f"[{stage}] Loaded {os.path.basename(file_path)} {dataframe.shape}: "
+                     f"{before / 2 ** 20:.1f} MB as read, {after / 2 ** 20:.1f} MB downcast")
+        return dataframe
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+class FeatureStoreWriter:
+
+    """
+    Writes DataFrame chunks to the feature store file one after the other.
+
+    The format follows the file extension: Parquet files are written with the schema.yaml dtypes
+    in row groups of FEATURE_STORE_ROW_GROUP_SIZE rows, CSV files as text. Chunks are appended to
+    a temporary file beside the target, which replaces the target only when the writer is closed
+    without an error, so readers never see a partial export.
+    """
+
+    def __init__(self, file_path: str, schema: Optional[dict] = None,
+                 row_group_size: int = FEATURE_STORE_ROW_GROUP_SIZE):
+        """
+        :param schema: Parsed schema.yaml; chunks are cast to its dtypes when given
+        """
+        self.file_path = file_path
+        self.temp_file_path = f"{file_path}.partial"
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.columns = None
+        self._parquet_writer = None
+        self._pending: List = []
+        self._pending_rows = 0
+
+    def __enter__(self) -> "FeatureStoreWriter":
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        if os.path.exists(self.temp_file_path):
+            os.remove(self.temp_file_path)
+        return self
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        elif list(chunk.columns) != self.columns:
+            raise ValueError(f"Chunk columns {list(chunk.columns)} differ from {self.columns}")
+        if self.schema is not None:
+            chunk = apply_schema_dtypes(chunk, self.schema)
+        if is_parquet(self.file_path):
+            self._write_parquet(chunk)
+        else:
+            chunk.to_csv(self.temp_file_path, mode="a", index=False, header=self.rows == 0)
+        self.rows += len(chunk)
+
+    def _write_parquet(self, chunk: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        if self._parquet_writer is None:
+            import pyarrow.parquet as pq
+
+            table_schema = (arrow_schema(self.schema, self.columns) if self.schema is not None
+                            else pa.Schema.from_pandas(chunk, preserve_index=False))
+            self._parquet_writer = pq.ParquetWriter(self.temp_file_path, table_schema,
+                                                    compression=FEATURE_STORE_COMPRESSION)
+        self._pending.append(pa.Table.from_pandas(chunk, schema=self._parquet_writer.schema, preserve_index=False))
+        self._pending_rows += len(chunk)
+        # chunks are buffered so row groups are large enough for their statistics to be useful
+        if self._pending_rows >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            import pyarrow as pa
+
+            self._parquet_writer.write_table(pa.concat_tables(self._pending), row_group_size=self.row_group_size)
+            self._pending, self._pending_rows = [], 0
+
+    def write_all(self, chunks: Iterable[pd.DataFrame]) -> int:
+        for chunk in chunks:
+            self.write(chunk)
+        return self.rows
+
+    def _write_empty(self) -> None:
+        # an empty export keeps the columns of the chunks, or of the schema when no chunk came,
+        # with the schema dtypes, so it reads and validates like any other feature store file
+        columns = self.columns
+        if columns is None:
+            columns = list(schema_column_types(self.schema)) if self.schema is not None else []
+        empty = pd.DataFrame(columns=columns)
+        if self.schema is not None:
+            empty = apply_schema_dtypes(empty, self.schema)
+        if is_parquet(self.file_path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table_schema = arrow_schema(self.schema, columns) if self.schema is not None else None
+            pq.write_table(pa.Table.from_pandas(empty, schema=table_schema, preserve_index=False),
+                           self.temp_file_path, compression=FEATURE_STORE_COMPRESSION)
+        else:
+            empty.to_csv(self.temp_file_path, index=False)
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._parquet_writer is not None:
+            if exc_type is None:
+                self._flush()
+            self._parquet_writer.close()
+        if exc_type is not None:
+            if os.path.exists(self.temp_file_path):
+                os.remove(self.temp_file_path)
+            return
+        if self.rows == 0:
+            self._write_empty()
+        os.replace(self.temp_file_path, self.file_path)
+        logging.info(f"Wrote {self.rows} rows to the feature store {self.file_path}")
+
+
+def write_feature_store(chunks: Iterable[pd.DataFrame], file_path: str, schema: Optional[dict] = None) -> int:
+    """
+    Streams the chunks into the feature store file and returns the number of rows written.
+    """
+    try:
+        with FeatureStoreWriter(file_path, schema=schema) as writer:
+            return writer.write_all(chunks)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def _merge_csv_shards(shard_paths: List[str], file_path: str) -> None:
+    header = None
+    with open(file_path, "wb") as merged:
+        for shard_path in shard_paths:
+            with open(shard_path, "rb") as shard:
+                shard_header = shard.readline()
+                if header is None:
+                    header = shard_header
+                    merged.write(header)
+                elif shard_header != header:
+                    raise ValueError(f"Shard {shard_path} has a different header")
+                shutil.copyfileobj(shard, merged)
+
+
+def _merge_parquet_shards(shard_paths: List[str], file_path: str) -> None:
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for shard_path in shard_paths:
+            shard = pq.ParquetFile(shard_path)
+            if writer is None:
+                writer = pq.ParquetWriter(file_path, shard.schema_arrow, compression=FEATURE_STORE_COMPRESSION)
+            for row_group in range(shard.num_row_groups):
+                writer.write_table(shard.read_row_group(row_group))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def merge_shards(manifest: List[dict], file_path: str, manifest_path: Optional[str] = None) -> int:
+    """
+    Concatenates the shards listed in the manifest, in order, into the feature store file and
+    writes the merged manifest when manifest_path is given. CSV shards are copied without parsing,
+    the row groups of Parquet shards are copied without converting them to pandas. Empty shards
+    are skipped, unless every shard is empty.
+    Returns the number of rows merged.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        temp_file_path = f"{file_path}.partial"
+        shard_paths = [entry["shard"] for entry in manifest if entry["rows"] > 0] or \
+                      [entry["shard"] for entry in manifest[:1]]
+        for shard_path in shard_paths:
+            if is_parquet(shard_path) != is_parquet(file_path):
+                raise ValueError(f"Shard {shard_path} and the merged file {file_path} have different formats; "
+                                 f"shards are copied as they are, so both must be Parquet or both CSV")
+        if is_parquet(file_path):
+            _merge_parquet_shards(shard_paths, temp_file_path)
+        else:
+            _merge_csv_shards(shard_paths, temp_file_path)
+        os.replace(temp_file_path, file_path)
+
+        rows = sum(entry["rows"] for entry in manifest)
+        if manifest_path is not None:
+            with open(manifest_path, "w") as manifest_file:
+                json.dump({"file_path": file_path, "rows": rows, "shards": manifest}, manifest_file, indent=2)
+        logging.info(f"Merged {len(manifest)} shards with {rows} rows into {file_path}")
+        return rows
+
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+class IncrementalFeatureStore:
+
+    """
+    Persistent feature store that grows by one partition per incremental export.
+
+    Each partition is a file holding the documents fetched by one export, which may repeat
+    documents of earlier partitions. The state file records the partitions and the high-water
+    mark, the largest MongoDB _id exported so far; it is only updated once a partition is
+    completely written, so an interrupted export is fetched again by the next one. export() and
+    compact() stream the partitions chunk by chunk and drop duplicate records.
+    """
+
+    def __init__(self, store_dir: str, schema: Optional[dict] = None,
+                 file_format: str = FEATURE_STORE_FILE_FORMAT, id_column: str = "_id"):
+        """
+        :param store_dir: Directory of the store, created on first use
+        :param schema: Parsed schema.yaml the partitions are typed with
+        :param file_format: Format of new partitions, "parquet" or "csv"
+        :param id_column: Column of the exported chunks holding the MongoDB _id, not stored
+        """
+        self.store_dir = store_dir
+        self.schema = schema
+        self.file_format = file_format
+        self.id_column = id_column
+        self.state_file_path = os.path.join(store_dir, STATE_FILE_NAME)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Serializes exports and compactions of the store across processes."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_state(self) -> dict:
+        try:
+            with open(self.state_file_path) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return {"watermark": None, "partitions": [], "next_partition": 0, "rows": 0}
+
+    def _write_state(self, state: dict) -> None:
+        state["updated_at"] = time.time()
+        with open(self.state_file_path + ".tmp", "w") as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(self.state_file_path + ".tmp", self.state_file_path)
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self.read_state()["watermark"]
+
+    @property
+    def partition_paths(self) -> List[str]:
+        return [os.path.join(self.store_dir, name) for name in self.read_state()["partitions"]]
+
+    def append(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Writes the chunks, in _id order, as a new partition and advances the high-water mark.
+        Returns the number of rows added.
+        """
+        try:
+            state = self.read_state()
+            name = f"part-{state['next_partition']:05d}.{self.file_format}"
+            path = os.path.join(self.store_dir, name)
+            watermark = state["watermark"]
+
+            with FeatureStoreWriter(path, schema=self.schema) as writer:
+                for chunk in chunks:
+                    if len(chunk) == 0:
+                        continue
+                    # a re-read window before the mark must not move it back
+                    watermark = max(filter(None, (watermark, str(chunk[self.id_column].iloc[-1]))))
+                    writer.write(chunk.drop(columns=[self.id_column]))
+
+            if writer.rows == 0:
+                os.remove(path)
+                logging.info(f"No new documents after {state['watermark']}")
+                return 0
+
+            state["partitions"].append(name)
+            state["next_partition"] += 1
+            state["rows"] += writer.rows
+            state["watermark"] = watermark
+            self._write_state(state)
+            logging.info(f"Appended {writer.rows} rows to {path}, high-water mark {watermark}")
+            return writer.rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def iter_partitions(self, batch_size: int = FEATURE_STORE_ROW_GROUP_SIZE) -> Iterator[pd.DataFrame]:
+        for path in self.partition_paths:
+            yield from iter_feature_store(path, batch_size=batch_size)
+
+    def iter_deduplicated(self, dedupe_columns: Optional[List[str]] = None,
+                          batch_size: int = FEATURE_STORE_ROW_GROUP_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Streams the partitions in chunks, keeping only the most recently exported copy of records
+        with equal dedupe_columns (every column when None). A first pass reads only those columns
+        and keeps one 64-bit hash per row in memory.
+        """
+        hashes = [pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                  for path in self.partition_paths
+                  for chunk in iter_feature_store(path, columns=dedupe_columns, batch_size=batch_size)]
+        keep = ~pd.Series(np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)).duplicated(keep="last")
+        keep = keep.to_numpy()
+        start = 0
+        for chunk in self.iter_partitions(batch_size=batch_size):
+            yield chunk[keep[start:start + len(chunk)]]
+            start += len(chunk)
+
+    def export(self, file_path: str, dedupe_columns: Optional[List[str]] = None) -> int:
+        """
+        Writes every partition into one file without duplicate records (see iter_deduplicated),
+        e.g. the feature store file of a training run.
+        """
+        return write_feature_store(self.iter_deduplicated(dedupe_columns), file_path, schema=self.schema)
+
+    def compact(self, dedupe_columns: Optional[List[str]] = None) -> int:
+        """
+        Merges all partitions into one. Records with equal dedupe_columns (every column when None)
+        are kept only once, the most recently exported copy wins.
+        Returns the number of rows left.
+        """
+        try:
+            state = self.read_state()
+            if not state["partitions"]:
+                return 0
+            old_paths = self.partition_paths
+
+            name = f"part-{state['next_partition']:05d}.{self.file_format}"
+            rows = write_feature_store(self.iter_deduplicated(dedupe_columns), os.path.join(self.store_dir, name),
+                                       schema=self.schema)
+
+            removed = state["rows"] - rows
+            state.update(partitions=[name], next_partition=state["next_partition"] + 1, rows=rows)
+            self._write_state(state)
+            for path in old_paths:
+                os.remove(path)
+            logging.info(f"Compacted {len(old_paths)} partitions of {self.store_dir} into {name}, "
+                         f"dropped {removed} duplicate rows")
+            return rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
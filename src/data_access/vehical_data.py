@@ -1,10 +1,18 @@
+import os
 import sys 
+import time
+import multiprocessing
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import numpy as np 
-from typing import Optional
+from typing import Dict, Iterator, List, Optional
+from bson import ObjectId
 
 from src.configuration.mongodb_connection import MongoDBClient
-from src.constants import DATABASE_NAME
+from src.constants import (DATABASE_NAME, DATA_INGESTION_EXPORT_BATCH_SIZE, DATA_INGESTION_SAMPLES_PER_RANGE,
+                           FEATURE_STORE_FILE_FORMAT)
+from src.data_access.feature_store import write_feature_store
 from src.exception import MyException
 from src.logger import logging
 
@@ -25,6 +33,137 @@ class VehicleData:
         except Exception as e:
             raise MyException(e, sys)
         
+    def get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    @staticmethod
+    def to_typed_chunk(documents: List[dict], columns: Optional[List[str]] = None,
+                       column_types: Optional[Dict[str, str]] = None, include_id: bool = False) -> pd.DataFrame:
+        """
+        Converts a batch of documents to a DataFrame with 'na' values replaced with NaN and the
+        int and float columns of column_types converted to numeric dtypes.
+        With include_id, the '_id' column is kept as the hex string of the ObjectId.
+        """
+        df = pd.DataFrame.from_records(documents, columns=["_id", *columns] if include_id and columns else columns)
+        if "_id" in df.columns:
+            if include_id:
+                df["_id"] = df["_id"].astype(str)
+            else:
+                df = df.drop(columns=["_id"])
+        df.replace({"na": np.nan}, inplace=True)
+        for column, column_type in (column_types or {}).items():
+            if column_type in ("int", "float") and column in df.columns and df[column].dtype == object:
+                df[column] = pd.to_numeric(df[column])
+        return df
+
+    def iter_collection_chunks(self, collection_name: str, columns: Optional[List[str]] = None,
+                               column_types: Optional[Dict[str, str]] = None,
+                               batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                               database_name: Optional[str] = None,
+                               after_id: Optional[str] = None, include_id: bool = False,
+                               min_id: Optional[str] = None, max_id: Optional[str] = None) -> Iterator[pd.DataFrame]:
+
+        """
+        Streams a MongoDB collection as DataFrame chunks of at most batch_size rows.
+
+        Only the given columns are fetched from the server, and the cursor pulls the documents
+        in batches of batch_size, so at most one batch of documents is held at a time.
+        With after_id (an ObjectId hex string), only documents inserted after it are fetched;
+        min_id (inclusive) and max_id (exclusive) restrict the export to an _id range.
+        With include_id, documents come in _id order and chunks keep an '_id' column.
+        """
+
+        try:
+            collection = self.get_collection(collection_name, database_name)
+            projection = {column: 1 for column in columns} if columns else {}
+            if not include_id:
+                projection["_id"] = 0
+            id_filter = {}
+            if after_id:
+                id_filter["$gt"] = ObjectId(after_id)
+            if min_id:
+                id_filter["$gte"] = ObjectId(min_id)
+            if max_id:
+                id_filter["$lt"] = ObjectId(max_id)
+            query = {"_id": id_filter} if id_filter else {}
+            cursor = collection.find(query, projection=projection or None, batch_size=batch_size)
+            if include_id:
+                cursor = cursor.sort("_id", 1)
+
+            documents = []
+            for document in cursor:
+                documents.append(document)
+                if len(documents) == batch_size:
+                    yield self.to_typed_chunk(documents, columns, column_types, include_id)
+                    documents = []
+            if documents:
+                yield self.to_typed_chunk(documents, columns, column_types, include_id)
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_id_boundaries(self, collection_name: str, n_ranges: int, database_name: Optional[str] = None,
+                          samples_per_range: int = DATA_INGESTION_SAMPLES_PER_RANGE) -> List[str]:
+        """
+        Returns up to n_ranges - 1 ascending _id split points (ObjectId hex strings) taken from
+        a random sample of the collection, so the ranges hold roughly equal numbers of documents.
+        Split points are distinct and above the smallest _id, so no range is empty; a collection
+        with fewer documents than n_ranges gets fewer ranges.
+        """
+        try:
+            if n_ranges <= 1:
+                return []
+            collection = self.get_collection(collection_name, database_name)
+            pipeline = [{"$sample": {"size": n_ranges * samples_per_range}}, {"$project": {"_id": 1}}]
+            # hex strings of ObjectIds sort in _id order
+            sample = sorted(str(document["_id"]) for document in collection.aggregate(pipeline))
+            if not sample:
+                return []
+            first = collection.find_one({}, projection={"_id": 1}, sort=[("_id", 1)])
+            min_id = str(first["_id"]) if first is not None else sample[0]
+            boundaries = {sample[len(sample) * i // n_ranges] for i in range(1, n_ranges)}
+            return sorted(boundary for boundary in boundaries if boundary > min_id)
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_collection_in_parallel(self, collection_name: str, shard_dir: str, workers: int,
+                                      columns: Optional[List[str]] = None,
+                                      column_types: Optional[Dict[str, str]] = None,
+                                      batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                      database_name: Optional[str] = None,
+                                      use_processes: bool = True, schema: Optional[dict] = None) -> List[dict]:
+
+        """
+        Splits the collection into _id ranges and exports each range to its own shard in shard_dir
+        (typed with schema when given), one worker per range. Workers are spawned processes that each open their own MongoClient;
+        with use_processes=False they are threads sharing this process's client.
+        Returns one manifest entry per shard, in _id order.
+        """
+
+        try:
+            boundaries = self.get_id_boundaries(collection_name, workers, database_name)
+            edges = [None, *boundaries, None]
+            ranges = list(zip(edges[:-1], edges[1:]))
+            os.makedirs(shard_dir, exist_ok=True)
+            logging.info(f"Exporting {collection_name} in {len(ranges)} _id ranges split at {boundaries}")
+
+            if use_processes:
+                pool = ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn"))
+            else:
+                pool = ThreadPoolExecutor(max_workers=len(ranges))
+            with pool:
+                futures = [pool.submit(export_id_range, collection_name,
+                                       os.path.join(shard_dir, f"shard-{i:03d}.{FEATURE_STORE_FILE_FORMAT}"),
+                                       min_id, max_id, columns, column_types, batch_size, database_name, schema)
+                           for i, (min_id, max_id) in enumerate(ranges)]
+                return [future.result() for future in futures]
+
+        except Exception as e:
+            raise MyException(e, sys)
+
     def export_collection_as_dataframe(self, collection_name:str, database_name: Optional[str] = None) -> pd.DataFrame:
 
         """
@@ -42,24 +181,37 @@ class VehicleData:
         """
 
         try: 
-            # Access specific collection from the default or specified database
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
-
-            # Convert collection data to DataFrame and preprocess
+            # Convert collection data to DataFrame chunks and preprocess
             logging.info("Fetching the data from MongoDB")
-            df = pd.DataFrame(list(collection.find()))
-            # print(df.head())
+            chunks = list(self.iter_collection_chunks(collection_name, database_name=database_name))
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
             logging.info(f"data fetched with len: {len(df)}")
-
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
-                # print(df.head())
-            df.replace({"na":np.nan}, inplace=True)
             return df 
         
         except Exception as e:
             raise MyException(e,sys)
-    
\ No newline at end of file
+
+
+def object_id_before(object_id: str, seconds: float) -> str:
+    """
+    Returns the smallest ObjectId (hex string) generated the given number of seconds before object_id.
+    """
+    generated_at = ObjectId(object_id).generation_time
+    return str(ObjectId.from_datetime(generated_at - timedelta(seconds=seconds)))
+
+
+def export_id_range(collection_name: str, shard_path: str, min_id: Optional[str], max_id: Optional[str],
+                    columns: Optional[List[str]] = None, column_types: Optional[Dict[str, str]] = None,
+                    batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE, database_name: Optional[str] = None,
+                    schema: Optional[dict] = None) -> dict:
+    """
+    Exports the documents with min_id <= _id < max_id to a feature store shard. Runs in an export worker,
+    where VehicleData opens the worker process's own MongoClient.
+    """
+    start = time.perf_counter()
+    chunks = VehicleData().iter_collection_chunks(collection_name, columns=columns, column_types=column_types,
+                                                  batch_size=batch_size, database_name=database_name,
+                                                  min_id=min_id, max_id=max_id)
+    rows = write_feature_store(chunks, shard_path, schema=schema)
+    return {"shard": shard_path, "min_id": min_id, "max_id": max_id, "rows": rows,
+            "seconds": time.perf_counter() - start}
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
@@ -29,6 +30,8 @@ class ClassificationMetricArtifact:
 class ModelTrainerArtifact:
     trained_model_file_path:str
     metric_artifact:ClassificationMetricArtifact
+    trained_model_bundle_file_path:Optional[str] = None
+    compression_report_file_path:Optional[str] = None
 
 
 @dataclass
@@ -37,6 +40,7 @@ class ModelEvaluationArtifact:
     changed_accuracy:float
     s3_model_path:str 
     trained_model_path:str
+    trained_model_bundle_path:Optional[str] = None
 
 @dataclass
 class ModelPusherArtifact:
@@ -1,54 +1,83 @@
 import os 
 from src.constants import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
+
+def get_timestamp() -> str:
+    return datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
 
-TIMESTAMP:str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
 
 @dataclass
 class TrainingPipelineConfig:
     pipeline_name: str=  PIPELINE_NAME
-    artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
-    timstamp : str = TIMESTAMP
-
+    artifact_dir: Optional[str] = None
+    timstamp : str = field(default_factory=get_timestamp)
 
-training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
+    def __post_init__(self):
+        # the timestamp is taken when a training run is configured, not when this module is imported
+        if self.artifact_dir is None:
+            self.artifact_dir = os.path.join(ARTIFACT_DIR, self.timstamp)
 
 
 @dataclass
 class DataIngestionConfig:
-    data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
-    feature_store_file_path:str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    testing_file_path : str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig, repr=False)
     train_test_split_ratio : float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
     collection_name : str = DATA_INGESTION_COLLECTION_NAME
+    export_batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE
+    schema_file_path: str = SCHEMA_FILE_PATH
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    incremental_store_dir: str = DATA_INGESTION_INCREMENTAL_STORE_DIR
+    compact_partitions: int = DATA_INGESTION_COMPACT_PARTITIONS
+    watermark_lookback_seconds: int = DATA_INGESTION_WATERMARK_LOOKBACK_SECONDS
+    dedupe_columns: list = field(default_factory=lambda: list(DATA_INGESTION_DEDUPE_COLUMNS))
+    export_workers: int = DATA_INGESTION_EXPORT_WORKERS
+    split_id_column: str = DATA_INGESTION_SPLIT_ID_COLUMN
+    split_salt: str = DATA_INGESTION_SPLIT_SALT
+    split_stratify: bool = DATA_INGESTION_SPLIT_STRATIFY
+
+    def __post_init__(self):
+        self.data_ingestion_dir: str = os.path.join(self.training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
+        self.feature_store_file_path:str = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
+        self.shard_dir: str = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, DATA_INGESTION_SHARD_DIR)
+        self.training_file_path: str = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
+        self.testing_file_path : str = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
 
 
 @dataclass
 class DataValidationConfig:
-    data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
-    validation_report_file_path:str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig, repr=False)
+
+    def __post_init__(self):
+        self.data_validation_dir: str = os.path.join(self.training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
+        self.validation_report_file_path:str = os.path.join(self.data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
 
 
 @dataclass
 class DataTransformationConfig:
-    data_transformation_dir:str= os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-    transformed_train_file_path:str = os.path.join(data_transformation_dir, DATA_TRANFORMATION_TRANSFORMED_DATA_DIR,
-                                                   TRAIN_FILE_NAME.replace("csv","npy"))
-    transformed_test_file_path:str = os.path.join(data_transformation_dir, DATA_TRANFORMATION_TRANSFORMED_DATA_DIR,
-                                                  TEST_FILE_NAME.replace("csv","npy"))
-    transformed_object_file_path: str = os.path.join(data_transformation_dir, 
-                                                     DATA_TRANFORMATION_TRANSFORMED_OBJECT_DIR,
-                                                     PREPROCESSING_OBJECT_FILE_NAME)
-    
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig, repr=False)
+
+    def __post_init__(self):
+        self.data_transformation_dir:str= os.path.join(self.training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
+        self.transformed_train_file_path:str = os.path.join(self.data_transformation_dir, DATA_TRANFORMATION_TRANSFORMED_DATA_DIR,
+                                                            os.path.splitext(TRAIN_FILE_NAME)[0] + ".npy")
+        self.transformed_test_file_path:str = os.path.join(self.data_transformation_dir, DATA_TRANFORMATION_TRANSFORMED_DATA_DIR,
+                                                           os.path.splitext(TEST_FILE_NAME)[0] + ".npy")
+        self.transformed_object_file_path: str = os.path.join(self.data_transformation_dir,
+                                                              DATA_TRANFORMATION_TRANSFORMED_OBJECT_DIR,
+                                                              PREPROCESSING_OBJECT_FILE_NAME)
+
 
 @dataclass
 class ModelTrainerConfig:
-    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
-    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    training_pipeline_config: TrainingPipelineConfig = field(default_factory=TrainingPipelineConfig, repr=False)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    compress_model_bundle: bool = MODEL_BUNDLE_COMPRESS
+    compress_forest: bool = MODEL_TRAINER_COMPRESS_FOREST
+    compression_f1_tolerance: float = MODEL_TRAINER_COMPRESSION_F1_TOLERANCE
+    compression_step: int = MODEL_TRAINER_COMPRESSION_STEP
     _n_estimators = MODEL_TRAINER_N_ESTIMATORS
     _min_samples_split = MODEL_TRAINER_MIN_SAMPLES_SPLIT
     _min_samples_leaf = MODEL_TRAINER_MIN_SAMPLES_LEAF
@@ -56,6 +85,13 @@ class ModelTrainerConfig:
     _criterion = MIN_SAMPLES_SPLIT_CRITERION
     _random_state = MIN_SAMPLES_SPLIT_RANDOM_STATE
 
+    def __post_init__(self):
+        self.model_trainer_dir: str = os.path.join(self.training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
+        self.trained_model_file_path: str = os.path.join(self.model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+        self.trained_model_bundle_file_path: str = os.path.join(self.model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                                MODEL_BUNDLE_FILE_NAME)
+        self.compression_report_file_path: str = os.path.join(self.model_trainer_dir, MODEL_TRAINER_COMPRESSION_REPORT_NAME)
+
 
 @dataclass
 class ModelEvaluationConfig:
@@ -67,12 +103,14 @@ class ModelEvaluationConfig:
 class ModelPusherConfig:
     bucket_name: str = MODEL_BUCKET_NAME
     s3_model_key_path: str = MODEL_FILE_NAME
+    s3_model_bundle_key_path: str = MODEL_BUNDLE_FILE_NAME
 
 
 @dataclass
 class VehiclePredictorConfig:
-    model_file_path: str = MODEL_FILE_NAME
+    model_file_path: str = MODEL_SERVING_FILE_NAME
     model_bucket_name: str = MODEL_BUCKET_NAME
+    model_refresh_interval: int = MODEL_REFRESH_INTERVAL_SECONDS
 
 
 
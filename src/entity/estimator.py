@@ -1,10 +1,26 @@
 import sys 
+import numpy as np
 import pandas as pd 
-from sklearn.pipeline import Pipeline
+from typing import TYPE_CHECKING, List, Mapping, Optional, Tuple
 
 
 from src.exception import MyException
-from src.logger import logging
+from src.logger import get_hot_path_logger
+from src.entity.inference_plan import InferencePlan
+from src.entity.tree_engine import FlatForest
+from src.constants import PREDICTION_TREE_ENGINE_MAX_ROWS
+from src.utils.metrics import PREDICTION_STAGE_SECONDS
+
+# scikit-learn is only imported when a model is unpickled or trained, not when serving code is imported
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+ALIGN_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="align")
+TRANSFORM_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="transform")
+FOREST_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="forest")
+
+# runs on every request, so INFO records are sampled
+logger = get_hot_path_logger(__name__)
 
 class TargetValueMapping:
     def __init__(self):
@@ -16,57 +32,199 @@ class TargetValueMapping:
         mapping_response = self._asdict()
         return dict(zip(mapping_response.values(),mapping_response.keys()))
 
+class ColumnAlignment:
+
+    """
+    Column layout the fitted preprocessor expects: the column order and the value of columns
+    missing from the input. Computed once per model and applied with a single reindex.
+    """
+
+    # missing columns were assigned a scalar 0 before, so they keep its int64 dtype
+    fill_value: int = 0
+
+    def __init__(self, columns: List[str]):
+        self.columns = pd.Index(columns)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessing_object) -> Optional["ColumnAlignment"]:
+        """Returns None when the preprocessor does not record the feature names it was fitted on."""
+        from sklearn.pipeline import Pipeline
+
+        preprocessor = preprocessing_object
+        if isinstance(preprocessing_object, Pipeline):
+            preprocessor = preprocessing_object.named_steps.get("preprocessor")
+        if preprocessor is None or not hasattr(preprocessor, "feature_names_in_"):
+            return None
+        return cls(list(preprocessor.feature_names_in_))
+
+    def apply(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the dataframe with exactly the expected columns in order; the input is never modified.
+        Already aligned frames are returned as they are.
+        """
+        if dataframe.columns.equals(self.columns):
+            return dataframe
+        return dataframe.reindex(columns=self.columns, fill_value=self.fill_value)
+
+
 class MyModel:
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    def __init__(self, preprocessing_object: "Pipeline", trained_model_object: object):
         """
         :param preprocessing_object: Input Object of preprocesser
         :param trained_model_object: Input Object of trained model 
         """
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self._inference_plan: Optional[InferencePlan] = None
+        self._inference_plan_compiled = False
+        self._tree_engine: Optional[FlatForest] = None
+        self._column_alignment: Optional[ColumnAlignment] = None
+        self._column_alignment_compiled = False
 
-    def predict(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+    def get_column_alignment(self) -> Optional[ColumnAlignment]:
         """
-        Function accepts preprocessed inputs (with all custom transformations already applied),
-        applies scaling using preprocessing_object, and performs prediction on transformed features.
+        Returns the column alignment of the preprocessing object, computing it on first use.
+        None when the preprocessor does not record its input columns.
         """
-        try:
-            logging.info("Starting prediction process.")
+        if not getattr(self, "_column_alignment_compiled", False):
+            self._column_alignment = ColumnAlignment.from_preprocessor(self.preprocessing_object)
+            self._column_alignment_compiled = True
+        return self._column_alignment
+
+    def get_inference_plan(self) -> Optional[InferencePlan]:
+        """
+        Returns the precompiled inference plan of the preprocessing object, compiling it on first use.
+        None when the preprocessor cannot be compiled, in which case the DataFrame path is used.
+        """
+        # Models pickled before the plan existed have neither attribute yet
+        if not getattr(self, "_inference_plan_compiled", False):
+            self._inference_plan = InferencePlan.from_preprocessor(self.preprocessing_object)
+            self._inference_plan_compiled = True
+        return self._inference_plan
+
+    def get_tree_engine(self) -> Optional[FlatForest]:
+        """
+        Returns the flattened array form of the trained forest, compiling it on first use.
+        None when the trained model is not a RandomForestClassifier.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+
+        engine = getattr(self, "_tree_engine", None)
+        if engine is None and isinstance(self.trained_model_object, RandomForestClassifier):
+            engine = FlatForest.from_sklearn(self.trained_model_object)
+            self._tree_engine = engine
+        return engine
 
-            # Align input dataframe columns with the fitted preprocessor expectations
+    def _predict_array(self, transformed_feature: np.ndarray) -> np.ndarray:
+        engine = self.get_tree_engine()
+        with FOREST_SECONDS.time():
+            if engine is not None and len(transformed_feature) <= PREDICTION_TREE_ENGINE_MAX_ROWS:
+                return engine.predict(transformed_feature)
+            return self.trained_model_object.predict(transformed_feature)
+
+    def _predict_proba_array(self, transformed_feature: np.ndarray) -> np.ndarray:
+        engine = self.get_tree_engine()
+        with FOREST_SECONDS.time():
+            if engine is not None and len(transformed_feature) <= PREDICTION_TREE_ENGINE_MAX_ROWS:
+                return engine.predict_proba(transformed_feature)
+            return self.trained_model_object.predict_proba(transformed_feature)
+
+    def transform(self, dataframe: pd.DataFrame):
+        """
+        Aligns the input columns with the fitted preprocessor and applies the scaling transformations.
+        """
+        # Align input dataframe columns with the fitted preprocessor expectations
+        with ALIGN_SECONDS.time():
             try:
-                preprocessor = None
-                if isinstance(self.preprocessing_object, Pipeline):
-                    preprocessor = self.preprocessing_object.named_steps.get("preprocessor")
-                else:
-                    preprocessor = self.preprocessing_object
-
-                if preprocessor is not None and hasattr(preprocessor, "feature_names_in_"):
-                    expected_cols = list(preprocessor.feature_names_in_)
-                    missing_cols = [c for c in expected_cols if c not in dataframe.columns]
-                    # add missing columns with default 0 values
-                    for col in missing_cols:
-                        dataframe[col] = 0
-                    # reorder columns to match expected order
-                    dataframe = dataframe[expected_cols]
+                alignment = self.get_column_alignment()
+                if alignment is not None:
+                    dataframe = alignment.apply(dataframe)
 
             except Exception:
                 # If alignment fails, fall back to original dataframe and let transform raise if needed
-                logging.warning("Could not align input dataframe to preprocessor feature names; proceeding without alignment")
+                logger.warning("Could not align input dataframe to preprocessor feature names; proceeding without alignment")
+
+        # Apply scaling transformations using the pre-trained preprocessing object
+        with TRANSFORM_SECONDS.time():
+            return self.preprocessing_object.transform(dataframe)
+
+    def predict(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function accepts preprocessed inputs (with all custom transformations already applied),
+        applies scaling using preprocessing_object, and performs prediction on transformed features.
+        """
+        try:
+            logger.info("Starting prediction process.")
 
             # Step 1: Apply scaling transformations using the pre-trained preprocessing object
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            transformed_feature = self.transform(dataframe)
 
             # Step 2: Perform prediction using the trained model
-            logging.info("Using the trained model to get predictions")
-            predictions = self.trained_model_object.predict(transformed_feature)
+            logger.info("Using the trained model to get predictions")
+            predictions = self._predict_array(transformed_feature)
 
             return predictions
 
         except Exception as e:
-            logging.error("Error occurred in predict method", exc_info=True)
+            logger.error("Error occurred in predict method", exc_info=True)
+            raise MyException(e, sys) from e
+
+    def predict_with_proba(self, dataframe: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a whole batch with a single transform and a single forest evaluation.
+        Returns the predicted labels and the class probabilities, both in input row order.
+        """
+        try:
+            logger.info("Starting batch prediction process.")
+            transformed_feature = self.transform(dataframe)
+
+            # predict() of sklearn classifiers is argmax over predict_proba, so derive both from one pass
+            proba = self._predict_proba_array(transformed_feature)
+            predictions = self.trained_model_object.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+            return predictions, proba
+
+        except Exception as e:
+            logger.error("Error occurred in predict_with_proba method", exc_info=True)
+            raise MyException(e, sys) from e
+
+
+    def predict_records(self, records: List[Mapping]) -> np.ndarray:
+        """
+        Scores feature records (mappings of feature name to value) without building a DataFrame.
+        Predictions are identical to predict() on the equivalent DataFrame.
+        """
+        try:
+            plan = self.get_inference_plan()
+            if plan is None:
+                return self.predict(pd.DataFrame.from_records(records))
+
+            with TRANSFORM_SECONDS.time():
+                transformed_feature = plan.transform_records(records)
+            return self._predict_array(transformed_feature)
+
+        except Exception as e:
+            logger.error("Error occurred in predict_records method", exc_info=True)
             raise MyException(e, sys) from e
 
+    def predict_records_with_proba(self, records: List[Mapping]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Like predict_records, but also returns the class probabilities from the same forest evaluation.
+        """
+        try:
+            plan = self.get_inference_plan()
+            if plan is None:
+                return self.predict_with_proba(pd.DataFrame.from_records(records))
+
+            with TRANSFORM_SECONDS.time():
+                transformed_feature = plan.transform_records(records)
+            proba = self._predict_proba_array(transformed_feature)
+            predictions = self.trained_model_object.classes_.take(np.argmax(proba, axis=1), axis=0)
+            return predictions, proba
+
+        except Exception as e:
+            logger.error("Error occurred in predict_records_with_proba method", exc_info=True)
+            raise MyException(e, sys) from e
 
     def __repr__(self):
         return f"{type(self.trained_model_object).__name__}()"
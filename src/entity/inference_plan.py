@@ -0,0 +1,173 @@
+import threading
+from typing import List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from src.logger import logging
+
+
+class InferencePlan:
+
+    """
+    Precompiled replacement for the fitted preprocessing pipeline on the serving path.
+
+    The plan maps named input features straight into the column layout produced by the fitted
+    ColumnTransformer and applies the StandardScaler/MinMaxScaler coefficients with the same
+    floating point operations, in the same order, as scikit-learn. Its output is therefore
+    bit-for-bit identical to preprocessing_object.transform, without building a DataFrame.
+    """
+
+    def __init__(self, input_features: Sequence[str], output_sources: Sequence[str],
+                 std_index: np.ndarray, std_mean: np.ndarray, std_scale: np.ndarray,
+                 mm_index: np.ndarray, mm_scale: np.ndarray, mm_min: np.ndarray,
+                 mm_clip: Optional[Sequence[float]] = None):
+        """
+        :param input_features: Feature names the fitted preprocessor expects, in fit order
+        :param output_sources: Input feature feeding each transformed output column
+        :param std_index: Output columns standardised as (x - mean) / scale
+        :param mm_index: Output columns min-max scaled as x * scale + min
+        :param mm_clip: (low, high) clip range when the MinMaxScaler was fitted with clip=True
+        """
+        self.input_features = list(input_features)
+        self.output_sources = list(output_sources)
+        self.std_index = std_index
+        self.std_mean = std_mean
+        self.std_scale = std_scale
+        self.mm_index = mm_index
+        self.mm_scale = mm_scale
+        self.mm_min = mm_min
+        self.mm_clip = tuple(mm_clip) if mm_clip is not None else None
+        self._local = threading.local()
+
+    @property
+    def n_features_out(self) -> int:
+        return len(self.output_sources)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_local", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @classmethod
+    def from_preprocessor(cls, preprocessing_object) -> Optional["InferencePlan"]:
+        """
+        Compiles a plan from the fitted preprocessing object.
+        Returns None when the pipeline contains steps the plan cannot reproduce exactly.
+        """
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, StandardScaler
+
+        preprocessor = preprocessing_object
+        if isinstance(preprocessing_object, Pipeline):
+            if len(preprocessing_object.steps) != 1:
+                return None
+            preprocessor = preprocessing_object.steps[0][1]
+
+        if not isinstance(preprocessor, ColumnTransformer) or not hasattr(preprocessor, "feature_names_in_"):
+            return None
+
+        input_features = [str(c) for c in preprocessor.feature_names_in_]
+        output_sources: List[str] = []
+        std_index, std_mean, std_scale = [], [], []
+        mm_index, mm_scale, mm_min = [], [], []
+        mm_clip = None
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == "drop":
+                continue
+            columns = [input_features[c] if isinstance(c, (int, np.integer)) else str(c) for c in np.atleast_1d(columns)]
+            if len(columns) == 0:
+                continue
+            start = len(output_sources)
+            output_sources.extend(columns)
+            positions = list(range(start, start + len(columns)))
+
+            # newer scikit-learn wraps a passthrough remainder in an identity FunctionTransformer
+            if (isinstance(transformer, str) and transformer == "passthrough") or (
+                    isinstance(transformer, FunctionTransformer) and transformer.func is None):
+                continue
+            if isinstance(transformer, StandardScaler):
+                if not (transformer.with_mean and transformer.with_std):
+                    return None
+                std_index.extend(positions)
+                std_mean.append(transformer.mean_)
+                std_scale.append(transformer.scale_)
+            elif isinstance(transformer, MinMaxScaler):
+                clip = tuple(transformer.feature_range) if transformer.clip else None
+                if mm_index and clip != mm_clip:
+                    return None
+                mm_clip = clip
+                mm_index.extend(positions)
+                mm_scale.append(transformer.scale_)
+                mm_min.append(transformer.min_)
+            else:
+                logging.info(f"Inference plan does not support transformer {name}; using the DataFrame path")
+                return None
+
+        def _concat(parts):
+            return np.concatenate(parts) if parts else np.empty(0)
+
+        return cls(input_features=input_features, output_sources=output_sources,
+                   std_index=np.asarray(std_index, dtype=np.intp),
+                   std_mean=_concat(std_mean), std_scale=_concat(std_scale),
+                   mm_index=np.asarray(mm_index, dtype=np.intp),
+                   mm_scale=_concat(mm_scale), mm_min=_concat(mm_min),
+                   mm_clip=mm_clip)
+
+    def _scale(self, out: np.ndarray) -> np.ndarray:
+        # Same element-wise operations, in the same order, as StandardScaler/MinMaxScaler.transform
+        if len(self.std_index):
+            block = out[:, self.std_index]
+            block -= self.std_mean
+            block /= self.std_scale
+            out[:, self.std_index] = block
+        if len(self.mm_index):
+            block = out[:, self.mm_index]
+            block *= self.mm_scale
+            block += self.mm_min
+            if self.mm_clip is not None:
+                np.clip(block, self.mm_clip[0], self.mm_clip[1], out=block)
+            out[:, self.mm_index] = block
+        return out
+
+    def _fill_row(self, row: np.ndarray, record: Mapping) -> None:
+        # features absent from the record default to 0, like the column alignment in MyModel
+        for position, feature in enumerate(self.output_sources):
+            row[position] = float(record.get(feature, 0))
+
+    def transform_record(self, record: Mapping) -> np.ndarray:
+        """
+        Transforms one feature record into a (1, n_features_out) row.
+        The row buffer is preallocated per thread and overwritten by the next call on that thread.
+        """
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = np.empty((1, self.n_features_out), dtype=np.float64)
+            self._local.row = row
+        self._fill_row(row[0], record)
+        return self._scale(row)
+
+    def transform_dataframe(self, dataframe) -> np.ndarray:
+        """
+        Transforms a DataFrame holding the input features by name; missing columns default to 0.
+        """
+        out = np.empty((len(dataframe), self.n_features_out), dtype=np.float64)
+        for position, feature in enumerate(self.output_sources):
+            out[:, position] = dataframe[feature].to_numpy(dtype=np.float64) if feature in dataframe.columns else 0.0
+        return self._scale(out)
+
+    def transform_records(self, records: Sequence[Mapping]) -> np.ndarray:
+        """
+        Transforms a list of feature records into a (n_records, n_features_out) matrix.
+        """
+        if len(records) == 1:
+            return self.transform_record(records[0])
+        out = np.empty((len(records), self.n_features_out), dtype=np.float64)
+        for row, record in zip(out, records):
+            self._fill_row(row, record)
+        return self._scale(out)
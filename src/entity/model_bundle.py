@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import tempfile
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.constants import MODEL_BUNDLE_ALIGNMENT, MODEL_BUNDLE_FILE_EXTENSION
+from src.entity.inference_plan import InferencePlan
+from src.entity.tree_engine import FlatForest
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import load_object
+
+
+MAGIC = b"VIMODEL\0"
+FORMAT_VERSION = 1
+# magic, format version, flags (reserved), manifest length
+HEADER = struct.Struct("<8sHHI")
+
+PLAN_ARRAYS = ("std_index", "std_mean", "std_scale", "mm_index", "mm_scale", "mm_min")
+FOREST_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // MODEL_BUNDLE_ALIGNMENT) * MODEL_BUNDLE_ALIGNMENT
+
+
+def bundle_path_for(model_file_path: str) -> str:
+    """Path of the bundle written beside a pickled model, e.g. model.pkl -> model.bundle."""
+    return os.path.splitext(model_file_path)[0] + MODEL_BUNDLE_FILE_EXTENSION
+
+
+class BundledModel:
+
+    """
+    Serving model loaded from a bundle.
+
+    Holds only the fitted scaler coefficients (InferencePlan) and the flattened forest
+    (FlatForest), so loading it needs neither scikit-learn nor unpickling. Predictions are
+    identical to MyModel on the model the bundle was written from.
+    """
+
+    def __init__(self, inference_plan: InferencePlan, tree_engine: FlatForest, manifest: dict):
+        self.inference_plan = inference_plan
+        self.tree_engine = tree_engine
+        self.manifest = manifest
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.tree_engine.classes_
+
+    def get_inference_plan(self) -> InferencePlan:
+        return self.inference_plan
+
+    def get_tree_engine(self) -> FlatForest:
+        return self.tree_engine
+
+    def transform(self, dataframe: pd.DataFrame) -> np.ndarray:
+        return self.inference_plan.transform_dataframe(dataframe)
+
+    def _with_proba(self, transformed_feature: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        proba = self.tree_engine.predict_proba(transformed_feature)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0), proba
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        try:
+            return self.tree_engine.predict(self.transform(dataframe))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_with_proba(self, dataframe: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            return self._with_proba(self.transform(dataframe))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_records(self, records: List[Mapping]) -> np.ndarray:
+        try:
+            return self.tree_engine.predict(self.inference_plan.transform_records(records))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_records_with_proba(self, records: List[Mapping]) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            return self._with_proba(self.inference_plan.transform_records(records))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def __repr__(self):
+        return f"BundledModel({self.tree_engine.n_trees} trees, format {self.manifest['format_version']})"
+
+    def __str__(self):
+        return self.__repr__()
+
+
+def save_bundle(model, file_path: str, compress: bool = False, metadata: Optional[dict] = None) -> str:
+    """
+    Writes a MyModel as a bundle: a header, a JSON manifest, then every array as a raw block
+    aligned to MODEL_BUNDLE_ALIGNMENT bytes, optionally zlib-compressed.
+    Raises ValueError when the model's preprocessor or estimator cannot be compiled.
+    """
+    try:
+        plan = model.get_inference_plan()
+        engine = model.get_tree_engine()
+        if plan is None or engine is None:
+            raise ValueError("Only models with a compilable preprocessor and a RandomForestClassifier can be bundled")
+
+        arrays: Dict[str, np.ndarray] = {f"plan.{name}": getattr(plan, name) for name in PLAN_ARRAYS}
+        arrays.update({f"forest.{name}": getattr(engine, name) for name in FOREST_ARRAYS})
+        arrays["forest.classes"] = np.asarray(engine.classes_)
+        if arrays["forest.classes"].dtype.hasobject:
+            raise ValueError("Only numeric class labels can be bundled")
+
+        blocks, entries, offset = [], {}, 0
+        for name, array in arrays.items():
+            data = np.ascontiguousarray(array).tobytes()
+            stored = zlib.compress(data, 6) if compress else data
+            offset = _aligned(offset)
+            entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset,
+                             "nbytes": len(data), "stored_nbytes": len(stored), "crc32": zlib.crc32(stored)}
+            blocks.append((offset, stored))
+            offset += len(stored)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "created_at": time.time(),
+            "compression": "zlib" if compress else "none",
+            "plan": {"input_features": plan.input_features, "output_sources": plan.output_sources,
+                     "mm_clip": list(plan.mm_clip) if plan.mm_clip is not None else None},
+            "forest": {"max_depth": int(engine.max_depth), "n_features": int(engine.n_features),
+                       "chunk_size": int(engine.chunk_size)},
+            "metadata": metadata or {},
+            "arrays": entries,
+        }
+        manifest_bytes = json.dumps(manifest).encode()
+        data_start = _aligned(HEADER.size + len(manifest_bytes))
+
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, "wb") as file_obj:
+            file_obj.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(manifest_bytes)))
+            file_obj.write(manifest_bytes)
+            for block_offset, stored in blocks:
+                file_obj.seek(data_start + block_offset)
+                file_obj.write(stored)
+
+        logging.info(f"Saved model bundle {file_path} ({os.path.getsize(file_path)} bytes)")
+        return file_path
+
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def is_bundle(file_path: str) -> bool:
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read(len(MAGIC)) == MAGIC
+
+
+def read_manifest(file_path: str) -> Tuple[dict, int]:
+    """Returns the manifest of a bundle and the file offset of its first array block."""
+    with open(file_path, "rb") as file_obj:
+        magic, version, _, manifest_length = HEADER.unpack(file_obj.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_path} is not a model bundle")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{file_path} has bundle format {version}, newer than the supported {FORMAT_VERSION}")
+        manifest = json.loads(file_obj.read(manifest_length))
+    return manifest, _aligned(HEADER.size + manifest_length)
+
+
+def load_bundle(file_path: str, mmap: bool = True) -> BundledModel:
+    """
+    Loads a bundle from a local file. Uncompressed arrays are memory-mapped read-only when
+    mmap is True, so processes loading the same file share its pages.
+    """
+    try:
+        manifest, data_start = read_manifest(file_path)
+        compressed = manifest["compression"] == "zlib"
+
+        arrays = {}
+        with open(file_path, "rb") as file_obj:
+            for name, entry in manifest["arrays"].items():
+                dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+                if mmap and not compressed:
+                    if entry["nbytes"] == 0:
+                        arrays[name] = np.empty(shape, dtype=dtype)
+                    else:
+                        arrays[name] = np.memmap(file_path, dtype=dtype, mode="r",
+                                                 offset=data_start + entry["offset"], shape=shape)
+                    continue
+                file_obj.seek(data_start + entry["offset"])
+                stored = file_obj.read(entry["stored_nbytes"])
+                if zlib.crc32(stored) != entry["crc32"]:
+                    raise ValueError(f"Checksum mismatch in block {name} of {file_path}")
+                data = zlib.decompress(stored) if compressed else stored
+                arrays[name] = np.frombuffer(data, dtype=dtype).reshape(shape)
+
+        plan_info, forest_info = manifest["plan"], manifest["forest"]
+        plan = InferencePlan(input_features=plan_info["input_features"],
+                             output_sources=plan_info["output_sources"],
+                             mm_clip=plan_info["mm_clip"],
+                             **{name: arrays[f"plan.{name}"] for name in PLAN_ARRAYS})
+        engine = FlatForest(classes=arrays["forest.classes"], max_depth=forest_info["max_depth"],
+                            n_features=forest_info["n_features"], chunk_size=forest_info["chunk_size"],
+                            **{name: arrays[f"forest.{name}"] for name in FOREST_ARRAYS})
+        return BundledModel(inference_plan=plan, tree_engine=engine, manifest=manifest)
+
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def load_model_file(file_path: str, mmap: bool = True):
+    """Loads a local model file, either a bundle or a dill/pickle file written by save_object."""
+    if is_bundle(file_path):
+        return load_bundle(file_path, mmap=mmap)
+    return load_object(file_path)
+
+
+def load_bundle_from_s3(key: str, bucket_name: str, s3=None) -> BundledModel:
+    """
+    Downloads a bundle from S3 to a temporary file and loads it into memory.
+    """
+    from src.cloud_storage.aws_storage import SimpleStorageServices
+
+    s3 = s3 or SimpleStorageServices()
+    with tempfile.TemporaryDirectory() as download_dir:
+        download_path = os.path.join(download_dir, os.path.basename(key))
+        s3.download_file(key, bucket_name, download_path)
+        # read into memory: the temporary file is removed on return
+        return load_bundle(download_path, mmap=False)
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence
+
+from src.constants import PREDICTION_CACHE_SIZE
+from src.utils.metrics import Counter, Gauge
+
+
+CACHE_HITS = Counter("prediction_cache_hits_total", "Predictions served from the prediction cache")
+CACHE_MISSES = Counter("prediction_cache_misses_total", "Predictions that had to be computed by the model")
+CACHE_SIZE = Gauge("prediction_cache_entries", "Entries currently held in the prediction cache")
+
+
+class PredictionCache:
+
+    """
+    Bounded LRU cache of prediction results keyed on the feature vector.
+
+    Every lookup carries the version (S3 ETag) of the model that would score the rows;
+    when it differs from the version the entries were computed with, the whole cache is
+    dropped, so a hot-swapped model never serves results of its predecessor.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE):
+        """
+        :param max_size: Largest number of entries kept, 0 disables caching
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, keys: Sequence[Hashable], version: Optional[str]) -> List[Optional[object]]:
+        """
+        Returns the cached value of every key, None for keys that are not cached.
+        """
+        if not self.enabled:
+            return [None] * len(keys)
+
+        with self._lock:
+            self._check_version(version)
+            values = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+            hits = sum(value is not None for value in values)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        CACHE_HITS.inc(hits)
+        CACHE_MISSES.inc(len(keys) - hits)
+        return values
+
+    def put_many(self, keys: Sequence[Hashable], values: Sequence[object], version: Optional[str]) -> None:
+        """
+        Stores values computed by the given model version, evicting the least recently used entries.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            CACHE_SIZE.set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            CACHE_SIZE.set(0)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -1,9 +1,24 @@
 from src.cloud_storage.aws_storage import SimpleStorageServices
+from src.cloud_storage.model_cache import ModelCache
 from src.exception import MyException
+from src.logger import logging
 from src.entity.estimator import MyModel
+from src.constants import MODEL_BUNDLE_FILE_EXTENSION, MODEL_REFRESH_INTERVAL_SECONDS
+from src.entity.model_bundle import load_bundle_from_s3, load_model_file
+from src.utils.metrics import PREDICTION_STAGE_SECONDS, Gauge
 import sys 
+import time
+import threading
+from typing import Dict, Optional, Tuple
 from pandas import DataFrame
 
+
+MODEL_FETCH_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="model_fetch")
+MODEL_INFO = Gauge("prediction_model_info", "Version (S3 ETag) of the model being served, always 1",
+                   labelnames=("model_path", "version"))
+MODEL_LOADED_AT = Gauge("prediction_model_loaded_timestamp_seconds",
+                        "Unix time at which the model being served was swapped in", labelnames=("model_path",))
+
 class VehicleEstimator:
 
     """
@@ -38,7 +53,10 @@ class VehicleEstimator:
         Load the model from the model_path
         """
 
-        return self.s3.load_model(self.model_path, bucket_name=self.bucket_name)
+        with MODEL_FETCH_SECONDS.time():
+            if self.model_path.endswith(MODEL_BUNDLE_FILE_EXTENSION):
+                return load_bundle_from_s3(self.model_path, bucket_name=self.bucket_name, s3=self.s3)
+            return self.s3.load_model(self.model_path, bucket_name=self.bucket_name)
     
 
     def save_model(self, from_file, remove:bool=False) -> None:
@@ -64,4 +82,197 @@ class VehicleEstimator:
             return self.loaded_model.predict(dataframe=dataframe)
         
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+
+class ModelHolder:
+
+    """
+    Process-wide holder of the production model.
+
+    The model is downloaded once per (bucket, key) and shared by every request and thread.
+    Concurrent cold requests wait on a single download, and a background thread compares
+    the S3 ETag periodically so a newly pushed model is swapped in without a restart.
+    Downloads go through the host's ModelCache, so other worker processes map the same
+    files instead of downloading their own copy.
+    """
+
+    _holders: Dict[Tuple[str, str], "ModelHolder"] = {}
+    _holders_lock = threading.Lock()
+
+    def __init__(self, bucket_name: str, model_path: str,
+                 refresh_interval: int = MODEL_REFRESH_INTERVAL_SECONDS):
+        """
+        :param bucket_name: Name of model bucket
+        :param model_path: Location of your model in bucket
+        :param refresh_interval: Seconds between ETag checks, 0 disables background refresh
+        """
+
+        self.bucket_name = bucket_name
+        self.model_path = model_path
+        self.refresh_interval = refresh_interval
+        self._estimator: Optional[VehicleEstimator] = None
+        self.model_cache = ModelCache()
+        # (model, ETag) swapped as one reference so readers never see a mismatched pair
+        self._current: Optional[Tuple[MyModel, str]] = None
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    @classmethod
+    def get_holder(cls, bucket_name: str, model_path: str,
+                   refresh_interval: int = MODEL_REFRESH_INTERVAL_SECONDS) -> "ModelHolder":
+        """
+        Returns the shared holder for the given bucket and key, creating it on first use.
+        """
+
+        key = (bucket_name, model_path)
+        holder = cls._holders.get(key)
+        if holder is None:
+            with cls._holders_lock:
+                holder = cls._holders.get(key)
+                if holder is None:
+                    holder = cls(bucket_name, model_path, refresh_interval=refresh_interval)
+                    cls._holders[key] = holder
+        return holder
+
+    @property
+    def estimator(self) -> VehicleEstimator:
+        # created on first S3 access, so installing a local model needs no AWS credentials
+        if self._estimator is None:
+            self._estimator = VehicleEstimator(bucket_name=self.bucket_name, model_path=self.model_path)
+        return self._estimator
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """ETag of the model currently being served, None until the first load."""
+        current = self._current
+        return current[1] if current is not None else None
+
+    def get_model(self) -> MyModel:
+        """
+        Returns the cached model, downloading it on the first call only.
+        """
+
+        return self.get_versioned_model()[0]
+
+    def get_versioned_model(self) -> Tuple[MyModel, str]:
+        """
+        Returns the cached model together with its ETag, downloading it on the first call only.
+        """
+
+        current = self._current
+        if current is not None:
+            return current
+
+        with self._load_lock:
+            if self._current is None:
+                try:
+                    # the current ETag is looked up first, so a cached copy is only served when it
+                    # is the version in S3; _load then finds it in the cache without downloading
+                    try:
+                        etag = self.estimator.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+                    except Exception as e:
+                        cached = self.model_cache.get_latest(self.bucket_name, self.model_path)
+                        if cached is None:
+                            raise
+                        model, etag = cached
+                        logging.warning(f"Could not look up the ETag of {self.model_path} ({e}); serving the "
+                                        f"cached version {etag} until the refresher reaches S3")
+                        self._swap(self._prepare(model), etag)
+                    else:
+                        self._swap(self._load(etag), etag)
+                    logging.info(f"Model {self.model_path} loaded with ETag {etag}")
+                except Exception as e:
+                    raise MyException(e, sys) from e
+                self._start_refresher()
+            return self._current
+
+    def install(self, model: MyModel, version: str) -> None:
+        """
+        Serves the given model as the given version, e.g. a locally loaded model for benchmarks.
+        """
+
+        with self._load_lock:
+            self._swap(self._prepare(model), version)
+
+    def refresh(self) -> bool:
+        """
+        Reloads the model if its ETag changed in S3.
+        Returns True when a new model was swapped in.
+        """
+
+        try:
+            etag = self.estimator.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+            if etag == self.model_version:
+                return False
+
+            # Download outside the lock so requests keep using the current model meanwhile
+            model = self._load(etag)
+            with self._load_lock:
+                self._swap(model, etag)
+            logging.info(f"Swapped in new model {self.model_path} with ETag {etag}")
+            return True
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _load(self, etag: str) -> MyModel:
+        """
+        Returns the prepared model with the given ETag from the local model cache,
+        downloading it into the cache on a miss.
+        """
+        cache = self.model_cache
+        if not cache.enabled:
+            return self._prepare(self.estimator.load_model())
+
+        model = cache.get(self.bucket_name, self.model_path, etag)
+        if model is not None:
+            return self._prepare(model)
+
+        with cache.staging_file() as download_path:
+            with MODEL_FETCH_SECONDS.time():
+                self.estimator.s3.download_object(self.model_path, bucket_name=self.bucket_name,
+                                                  to_filename=download_path, etag=etag)
+                # read into memory: the download is removed once the model is in the cache
+                model = load_model_file(download_path, mmap=False)
+        # stored after preparing, so the compiled plan and tree engine are cached and mapped too
+        return cache.put(self.bucket_name, self.model_path, etag, self._prepare(model))
+
+    def _swap(self, model: MyModel, version: str) -> None:
+        # called with _load_lock held; the (model, version) tuple is replaced in a single assignment
+        if self._current is not None:
+            MODEL_INFO.remove(model_path=self.model_path, version=self._current[1])
+        self._current = (model, version)
+        MODEL_INFO.labels(model_path=self.model_path, version=version).set(1)
+        MODEL_LOADED_AT.labels(model_path=self.model_path).set(time.time())
+
+    @staticmethod
+    def _prepare(model: MyModel) -> MyModel:
+        # Compile the column alignment, inference plan and tree engine once at load time instead of on the first request
+        if hasattr(model, "get_column_alignment"):
+            model.get_column_alignment()
+        if hasattr(model, "get_inference_plan"):
+            model.get_inference_plan()
+        if hasattr(model, "get_tree_engine"):
+            model.get_tree_engine()
+        return model
+
+    def stop(self) -> None:
+        """Stops the background refresh thread."""
+        self._stop_event.set()
+
+    def _start_refresher(self) -> None:
+        if self.refresh_interval <= 0 or self._refresher is not None:
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop,
+                                           name=f"model-refresh-{self.model_path}",
+                                           daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep serving the current model, the next tick retries
+                logging.warning(f"Model refresh check failed: {e}")
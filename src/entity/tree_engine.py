@@ -0,0 +1,158 @@
+import numpy as np
+
+
+def _values_are_counts() -> bool:
+    # Before 1.4 classifier trees stored class counts in tree_.value and normalised them in predict_proba
+    import sklearn
+    from sklearn.utils.fixes import parse_version
+    return parse_version(sklearn.__version__) < parse_version("1.4")
+
+
+class FlatForest:
+
+    """
+    Struct-of-arrays form of a fitted RandomForestClassifier.
+
+    Every node of every tree lives in the same contiguous arrays (feature index, threshold,
+    child offsets and leaf class probabilities) and a whole batch is routed through
+    all trees at once with vectorized NumPy indexing. Leaves point to themselves, so every
+    sample can simply take max_depth steps.
+
+    Thresholds are stored as float32 rounded down, which keeps `x <= threshold` identical to
+    scikit-learn's float32-vs-float64 comparison. Leaf probabilities stay float64 and are summed
+    in tree order, like RandomForestClassifier.predict_proba, so outputs are identical.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, classes: np.ndarray, n_features: int,
+                 chunk_size: int = 256):
+        """
+        :param feature: int32 feature index tested at each node (0 for leaves)
+        :param threshold: float32 split threshold of each node
+        :param children: int32 array of shape (n_nodes, 2) holding the [right, left] child of each node
+        :param value: float64 class probabilities of each node, shape (n_nodes, n_classes)
+        :param roots: int32 index of the root node of each tree
+        :param chunk_size: rows routed together, small enough for the working set to stay in cache
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self._children_flat = children.reshape(-1)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_children_flat", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._children_flat = self.children.reshape(-1)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """
+        Compiles a fitted single-output RandomForestClassifier.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+
+        if not isinstance(model, RandomForestClassifier):
+            raise TypeError(f"Expected a RandomForestClassifier, got {type(model).__name__}")
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be flattened")
+
+        values_are_counts = _values_are_counts()
+        features, thresholds, children, values, roots = [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.column_stack([np.where(is_leaf, node_ids, tree.children_right),
+                                             np.where(is_leaf, node_ids, tree.children_left)]) + offset)
+
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            if values_are_counts:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        threshold64 = np.concatenate(thresholds)
+        threshold = threshold64.astype(np.float32)
+        # round down so that x32 <= threshold32 exactly when x32 <= threshold64
+        rounded_up = threshold.astype(np.float64) > threshold64
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        return cls(feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+                   threshold=np.ascontiguousarray(threshold),
+                   children=np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+                   value=np.ascontiguousarray(np.concatenate(values)),
+                   roots=np.asarray(roots, dtype=np.int32),
+                   max_depth=int(max_depth),
+                   classes=np.asarray(model.classes_),
+                   n_features=int(model.n_features_in_))
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        # X is a C-contiguous float32 chunk; node holds one position per (sample, tree)
+        flat_x = X.reshape(-1)
+        row_base = (np.arange(X.shape[0], dtype=np.int32) * X.shape[1])[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_left = np.take(flat_x, np.take(self.feature, node) + row_base) <= np.take(self.threshold, node)
+            node = np.take(self._children_flat, node * 2 + go_left)
+        return node
+
+    def _check_input(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has shape {X.shape}, expected (n_samples, {self.n_features})")
+        return X
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Returns the global leaf index reached by every sample in every tree, shape (n_samples, n_trees).
+        """
+        X = self._check_input(X)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.int32)
+        for start in range(0, X.shape[0], self.chunk_size):
+            leaves[start:start + self.chunk_size] = self._apply_chunk(X[start:start + self.chunk_size])
+        return leaves
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities averaged over all trees, shape (n_samples, n_classes).
+        """
+        X = self._check_input(X)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            leaves = self._apply_chunk(X[start:start + self.chunk_size])
+            # cumsum adds trees one after another, the same order as sklearn's accumulation
+            proba[start:start + self.chunk_size] = np.cumsum(np.take(self.value, leaves, axis=0), axis=1)[:, -1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
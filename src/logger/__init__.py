@@ -1,6 +1,11 @@
+import atexit
+import itertools
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from from_root import from_root
 from datetime import datetime
 
@@ -8,23 +13,114 @@ from datetime import datetime
 LOG_DIR = 'logs'
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 MAX_LOG_SIZE = 5*1024*1024 # 5MB
-BACKUP_COUNT = 3 # Number of backup log files to keep 
+BACKUP_COUNT = 3 # Number of backup log files to keep
 
-# construct log file path 
+# Configuration from the environment
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "DEBUG")
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "INFO")
+# comma-separated logger=LEVEL pairs, e.g. "src.entity.estimator=WARNING,botocore=INFO"
+LOG_MODULE_LEVELS = os.getenv("LOG_MODULE_LEVELS", "")
+# share of INFO and DEBUG records kept on hot-path loggers; WARNING and above are always kept
+LOG_HOT_PATH_SAMPLE_RATE = float(os.getenv("LOG_HOT_PATH_SAMPLE_RATE", "0.01"))
+# upper bound of INFO and DEBUG records per second on each hot-path logger, 0 for no bound
+LOG_HOT_PATH_MAX_PER_SECOND = float(os.getenv("LOG_HOT_PATH_MAX_PER_SECOND", "0"))
+
+# construct log file path
 log_dir_path = os.path.join(from_root(), LOG_DIR)
 os.makedirs(log_dir_path, exist_ok= True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+
+    """
+    Keeps every n-th record below WARNING, where n is 1 / rate.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+
+class RateLimitFilter(logging.Filter):
+
+    """
+    Keeps at most max_per_second records below WARNING in each one-second window.
+    """
+
+    def __init__(self, max_per_second: float):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self._window = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window, self._count = window, 0
+            self._count += 1
+            return self._count <= self.max_per_second
+
+
+def parse_module_levels(spec: str) -> dict:
+    """Parses "name=LEVEL,name=LEVEL" into a dict of logger name to level name."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def get_hot_path_logger(name: str) -> logging.Logger:
+    """
+    Returns the named logger for code that runs on every request, with sampling and
+    rate limiting of its INFO and DEBUG records as configured in the environment.
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, (SamplingFilter, RateLimitFilter)) for f in logger.filters):
+        if LOG_HOT_PATH_SAMPLE_RATE < 1:
+            logger.addFilter(SamplingFilter(LOG_HOT_PATH_SAMPLE_RATE))
+        if LOG_HOT_PATH_MAX_PER_SECOND > 0:
+            logger.addFilter(RateLimitFilter(LOG_HOT_PATH_MAX_PER_SECOND))
+    return logger
+
+
+def stop_logging():
+    """Writes out the queued records and stops the background logging thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def configure_logger():
 
     """
     Configure logging with a rotating file handler and a console handler.
+
+    Both handlers run on a background QueueListener thread; the root logger only holds a
+    QueueHandler, so logging threads never block on file or console writes.
     """
 
-    # create a custom logger 
+    global _listener
+
+    # create a custom logger
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(LOG_LEVEL)
 
     # define formatter
     formatter = logging.Formatter('[%(asctime)s] %(name)s - %(levelname)s - %(message)s')
@@ -32,16 +128,23 @@ def configure_logger():
     # File handler with rotation
     file_handler = RotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setLevel(LOG_FILE_LEVEL)
 
-    # Consol handler 
+    # Consol handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(LOG_CONSOLE_LEVEL)
+
+    # unbounded, so a burst of records is never dropped and enqueueing never waits
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
+    # Add handler to the logger
+    logger.addHandler(QueueHandler(log_queue))
 
-    # Add handler to the logger 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    for name, level in parse_module_levels(LOG_MODULE_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
 
 configure_logger()
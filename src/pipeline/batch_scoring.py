@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import multiprocessing
+from collections import deque
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from src.constants import BATCH_SCORING_CHUNK_SIZE, BATCH_SCORING_WORKERS, SCHEMA_FILE_PATH
+from src.exception import MyException
+from src.logger import logging
+from src.entity.model_bundle import load_model_file
+from src.utils.main_utils import read_yaml_file
+
+
+VEHICLE_AGE_DUMMIES = {
+    "Vehicle_Age_lt_1_Year": "< 1 Year",
+    "Vehicle_Age_gt_2_Years": "> 2 Years",
+}
+
+
+def prepare_features(df: pd.DataFrame, drop_column: str) -> pd.DataFrame:
+    """
+    Applies DataTransformation's feature engineering to one chunk of raw records.
+
+    Unlike pd.get_dummies(drop_first=True), the dummy columns are built from the fixed category
+    values, so every chunk gets the same columns whichever categories it happens to contain.
+    Chunks that already hold the engineered columns are passed through.
+    """
+    if "Gender" in df.columns and not pd.api.types.is_numeric_dtype(df["Gender"]):
+        df["Gender"] = df["Gender"].map({"Female": 0, "Male": 1}).astype(int)
+    if drop_column in df.columns:
+        df = df.drop(columns=[drop_column])
+    if "Vehicle_Age" in df.columns:
+        for column, category in VEHICLE_AGE_DUMMIES.items():
+            df[column] = (df["Vehicle_Age"] == category).astype(int)
+        df = df.drop(columns=["Vehicle_Age"])
+    if "Vehicle_Damage" in df.columns:
+        df["Vehicle_Damage_Yes"] = (df["Vehicle_Damage"] == "Yes").astype(int)
+        df = df.drop(columns=["Vehicle_Damage"])
+    return df
+
+
+# Per-process state, set by the pool initializer
+_worker_model = None
+_worker_drop_column = None
+
+
+def _init_worker(model_path: Optional[str], drop_column: str) -> None:
+    """
+    Pool initializer: loads the model once per worker process.
+    """
+    global _worker_model, _worker_drop_column
+    if model_path:
+        _worker_model = load_model_file(model_path)
+    else:
+        from src.pipeline.prediction_pipeline import VehicleDataClassifier
+        _worker_model = VehicleDataClassifier().get_model()
+    _worker_drop_column = drop_column
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    try:
+        features = prepare_features(chunk.copy(), _worker_drop_column)
+        predictions, proba = _worker_model.predict_with_proba(features)
+
+        result = pd.DataFrame({"prediction": predictions.astype(int), "probability": proba[:, -1]},
+                              index=chunk.index)
+        if "id" in chunk.columns:
+            result.insert(0, "id", chunk["id"].to_numpy())
+        return result
+    except Exception as e:
+        # MyException cannot be pickled back to the parent process
+        raise RuntimeError(str(e)) from None
+
+
+class BatchScoringPipeline:
+
+    """
+    Scores a large CSV or JSONL file offline.
+
+    The input is streamed in fixed-size chunks, each chunk is scored by a pool of worker
+    processes that hold the model once, and results are appended to the output in input
+    order as they complete. Only a bounded number of chunks is in flight at any time, so
+    memory stays flat regardless of the file size.
+    """
+
+    def __init__(self, input_path: str, output_path: str, model_path: Optional[str] = None,
+                 chunk_size: int = BATCH_SCORING_CHUNK_SIZE, workers: int = BATCH_SCORING_WORKERS):
+        """
+        :param input_path: CSV or JSONL (.jsonl/.json) file with raw or engineered records
+        :param output_path: CSV or JSONL file receiving id, prediction and probability
+        :param model_path: Local model file or bundle saved by ModelTrainer; the S3 production model when None
+        :param chunk_size: Rows read and scored together
+        :param workers: Number of scoring processes
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.model_path = model_path
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+    @staticmethod
+    def _is_jsonl(path: str) -> bool:
+        return path.endswith((".jsonl", ".json"))
+
+    def read_chunks(self) -> Iterator[pd.DataFrame]:
+        if self._is_jsonl(self.input_path):
+            reader = pd.read_json(self.input_path, lines=True, chunksize=self.chunk_size)
+        else:
+            reader = pd.read_csv(self.input_path, chunksize=self.chunk_size, na_values="na")
+        with reader:
+            for chunk in reader:
+                yield chunk
+
+    def _write(self, result: pd.DataFrame, first: bool) -> None:
+        mode = "w" if first else "a"
+        if self._is_jsonl(self.output_path):
+            with open(self.output_path, mode) as output:
+                result.to_json(output, orient="records", lines=True)
+        else:
+            result.to_csv(self.output_path, mode=mode, header=first, index=False)
+
+    def run(self) -> int:
+        """
+        Scores the whole input file, returns the number of rows written.
+        """
+        try:
+            logging.info(f"Batch scoring {self.input_path} -> {self.output_path} "
+                         f"with {self.workers} workers, chunks of {self.chunk_size} rows")
+            start = time.perf_counter()
+            dir_path = os.path.dirname(self.output_path)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+
+            rows = 0
+            self._chunks_written = 0
+            max_pending = 2 * self.workers
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(processes=self.workers, initializer=_init_worker,
+                              initargs=(self.model_path, self._schema_config["drop_columns"])) as pool:
+                pending = deque()
+                for chunk in self.read_chunks():
+                    pending.append(pool.apply_async(_score_chunk, (chunk,)))
+                    # bound the number of chunks held in memory, writing results in input order
+                    while len(pending) >= max_pending:
+                        rows += self._write_next(pending)
+                while pending:
+                    rows += self._write_next(pending)
+
+            elapsed = time.perf_counter() - start
+            logging.info(f"Scored {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+            return rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _write_next(self, pending: deque) -> int:
+        result = pending.popleft().get()
+        self._write(result, first=self._chunks_written == 0)
+        self._chunks_written += 1
+        return len(result)
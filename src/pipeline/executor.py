@@ -0,0 +1,184 @@
+import sys
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from src.constants import (PREDICTION_EXECUTOR_MODE, PREDICTION_EXECUTOR_WORKERS, PREDICTION_FEATURE_COLUMNS,
+                           PREDICTION_WARMUP_RECORD)
+from src.entity.config_entity import VehiclePredictorConfig
+from src.exception import MyException
+from src.logger import logging
+
+# The inference stack (pandas, the model classes) is imported where the model is used, so in
+# process mode the serving process that only dispatches requests never loads it
+if TYPE_CHECKING:
+    from src.pipeline.prediction_pipeline import VehicleDataClassifier
+
+
+# Per-process classifier; set by the pool initializer in process mode
+_worker_classifier: Optional["VehicleDataClassifier"] = None
+
+
+def validate_feature_records(records: List[dict]) -> None:
+    """
+    Checks that every record is an object holding a numeric value for every model feature, before
+    it is dispatched. Raises ValueError naming the first offending record and feature.
+    """
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"Record {index} is not an object")
+        for column in PREDICTION_FEATURE_COLUMNS:
+            value = record.get(column)
+            if value is None:
+                raise ValueError(f"Record {index} has no value for feature {column}")
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Record {index} has a non-numeric value for feature {column}") from None
+
+
+def _init_worker(predictor_config: VehiclePredictorConfig) -> None:
+    """
+    Process pool initializer: loads the model once in each worker process.
+    A failed load is only logged: an initializer that raises breaks the whole pool, while the
+    tasks load the model again on first use.
+    """
+    from src.pipeline.prediction_pipeline import VehicleDataClassifier
+
+    global _worker_classifier
+    _worker_classifier = VehicleDataClassifier(prediction_pipeline_config=predictor_config)
+    try:
+        _worker_classifier.get_model()
+        logging.info("Prediction worker process ready")
+    except Exception as e:
+        logging.warning(f"Prediction worker process started without a model, loading it on first use: {e}")
+
+
+def _get_classifier() -> "VehicleDataClassifier":
+    global _worker_classifier
+    if _worker_classifier is None:
+        from src.pipeline.prediction_pipeline import VehicleDataClassifier
+        _worker_classifier = VehicleDataClassifier()
+    return _worker_classifier
+
+
+# Tasks run inside the pool. MyException cannot be pickled back from a worker process,
+# so failures are re-raised as RuntimeError carrying the formatted message.
+
+def _load_model_task() -> str:
+    try:
+        return str(_get_classifier().get_model())
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _warm_up_task(record: dict) -> None:
+    try:
+        # scores through the model directly, bypassing the prediction cache, so the plan and
+        # tree engine are compiled and the code paths are exercised in this worker
+        _get_classifier().get_model().predict_records_with_proba([record])
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _predict_records_task(records: List[dict]) -> List[int]:
+    try:
+        return _get_classifier().predict_records(records)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _predict_batch_task(records: List[dict]) -> Tuple[List[int], List[float]]:
+    try:
+        return _get_classifier().predict_batch(records)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+class PredictionExecutor:
+
+    """
+    Runs model loading and CPU-bound inference off the asyncio event loop.
+
+    mode="thread" shares the process-wide cached model between pool threads; mode="process"
+    spawns worker processes that each preload the model, so forest evaluation also runs in
+    parallel across cores.
+    """
+
+    def __init__(self, mode: str = PREDICTION_EXECUTOR_MODE, max_workers: int = PREDICTION_EXECUTOR_WORKERS,
+                 predictor_config: VehiclePredictorConfig = VehiclePredictorConfig()):
+        """
+        :param mode: "thread" or "process"
+        :param max_workers: Size of the pool
+        :param predictor_config: Model location used by the workers
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.predictor_config = predictor_config
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                # spawn: forking a process that already runs model-refresh threads is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.predictor_config,))
+            else:
+                from src.pipeline.prediction_pipeline import VehicleDataClassifier
+
+                global _worker_classifier
+                _worker_classifier = VehicleDataClassifier(prediction_pipeline_config=self.predictor_config)
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="prediction")
+            logging.info(f"Started {self.mode} prediction pool with {self.max_workers} workers")
+        return self._pool
+
+    async def run(self, fn, *args):
+        """
+        Runs fn(*args) in the pool and awaits its result without blocking the event loop.
+        A process pool broken by a crashed worker is discarded, so the next call starts a new one.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            return await loop.run_in_executor(pool, partial(fn, *args))
+        except BrokenProcessPool as e:
+            if self._pool is pool:
+                logging.error(f"Prediction process pool is broken, it is replaced on the next call: {e}")
+                self._pool = None
+                pool.shutdown(wait=False)
+            raise MyException(e, sys) from e
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    async def load_model(self) -> str:
+        return await self.run(_load_model_task)
+
+    async def warm_up(self, record: dict = PREDICTION_WARMUP_RECORD) -> None:
+        """
+        Loads the model and scores a dummy record once per worker, so the first real
+        request does not pay for the model download, unpickling and lazy imports.
+        """
+        start = time.perf_counter()
+        await self.load_model()
+        await asyncio.gather(*(self.run(_warm_up_task, record) for _ in range(self.max_workers)))
+        logging.info(f"Prediction workers warmed up in {time.perf_counter() - start:.2f}s")
+
+    async def predict_records(self, records: List[dict]) -> List[int]:
+        return await self.run(_predict_records_task, records)
+
+    async def predict_batch(self, records: List[dict]) -> Tuple[List[int], List[float]]:
+        return await self.run(_predict_batch_task, records)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
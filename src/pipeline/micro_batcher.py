@@ -0,0 +1,156 @@
+import sys
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+from src.constants import PREDICTION_BATCH_MAX_SIZE, PREDICTION_BATCH_MAX_WAIT_MS
+from src.exception import MyException
+from src.logger import logging
+from src.utils.metrics import Gauge, Histogram
+
+
+BATCHER_QUEUE_DEPTH = Gauge("prediction_batcher_queue_depth",
+                            "Single-row prediction requests waiting to be batched")
+BATCHER_BATCH_SIZE = Histogram("prediction_batcher_batch_size",
+                               "Number of rows scored together in one model call",
+                               buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+BATCHER_WAIT_SECONDS = Histogram("prediction_batcher_wait_seconds",
+                                 "Time a request spent queued before its batch was scored")
+
+
+class PredictionBatcher:
+
+    """
+    Coalesces concurrent single-row prediction requests into one model call.
+
+    Requests are collected for up to max_wait_ms or until max_batch_size rows are queued,
+    scored as a single matrix by score_fn, and every caller gets back its own row's result.
+    Up to max_in_flight batches are scored concurrently, which lets an executor-backed
+    score_fn keep several workers busy while the next batch is being collected.
+    """
+
+    def __init__(self, score_fn: Callable[[List[dict]], Union[List, Awaitable[List]]],
+                 max_wait_ms: float = PREDICTION_BATCH_MAX_WAIT_MS,
+                 max_batch_size: int = PREDICTION_BATCH_MAX_SIZE,
+                 max_in_flight: int = 1):
+        """
+        :param score_fn: Scores a list of feature records, returns one result per record in order.
+                         May be a coroutine function, e.g. PredictionExecutor.predict_records
+        :param max_wait_ms: Longest time the first queued request waits for others to join its batch
+        :param max_batch_size: Largest number of rows scored in one call
+        :param max_in_flight: Number of batches that may be scored at the same time
+        """
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_in_flight = max_in_flight
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # strong references so running batch tasks are not garbage collected
+        self._tasks = set()
+        # futures of every request not answered yet, wherever it is: queued, being collected or scored
+        self._pending = set()
+
+    def _ensure_started(self) -> None:
+        # The worker is bound to the running event loop; (re)create it if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, record: dict):
+        """
+        Queues one feature record and waits for its prediction.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        self._queue.put_nowait((record, future, self._loop.time()))
+        BATCHER_QUEUE_DEPTH.set(self._queue.qsize())
+        return await future
+
+    async def stop(self) -> None:
+        """
+        Cancels the background worker and the batches being scored. Every request not answered
+        yet, queued, being collected or in a batch being scored, is failed with a RuntimeError.
+        """
+        tasks = [task for task in (self._worker, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            BATCHER_QUEUE_DEPTH.set(0)
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped before the request was scored"))
+        self._pending.clear()
+
+    async def _collect(self) -> List[Tuple[dict, asyncio.Future, float]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        BATCHER_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    async def _score(self, records: List[dict]) -> List:
+        if asyncio.iscoroutinefunction(self.score_fn):
+            return await self.score_fn(records)
+        return self.score_fn(records)
+
+    async def _run(self) -> None:
+        while True:
+            await self._in_flight.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._in_flight.release()
+                raise
+            task = self._loop.create_task(self._score_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score_batch(self, batch: List[Tuple[dict, asyncio.Future, float]]) -> None:
+        try:
+            now = self._loop.time()
+            for _, _, enqueued_at in batch:
+                BATCHER_WAIT_SECONDS.observe(now - enqueued_at)
+            BATCHER_BATCH_SIZE.observe(len(batch))
+
+            records = [record for record, _, _ in batch]
+            try:
+                results = await self._score(records)
+                if len(results) != len(records):
+                    raise ValueError(f"score_fn returned {len(results)} results for {len(records)} records")
+            except Exception as e:
+                logging.error(f"Batched prediction of {len(records)} rows failed: {e}")
+                error = e if isinstance(e, MyException) else MyException(e, sys)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._in_flight.release()
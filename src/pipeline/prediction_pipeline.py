@@ -1,11 +1,24 @@
 import sys 
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from src.constants import PREDICTION_FEATURE_COLUMNS
 from src.entity.config_entity import VehiclePredictorConfig
-from src.entity.s3_estimator import VehicleEstimator
+from src.entity.prediction_cache import PredictionCache
+from src.utils.metrics import PREDICTION_STAGE_SECONDS
+from src.entity.s3_estimator import ModelHolder
 from src.exception import MyException
-from src.logger import logging
+from src.logger import get_hot_path_logger
 from pandas import DataFrame
 
 
+FRAME_BUILD_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="frame_build")
+CACHE_LOOKUP_SECONDS = PREDICTION_STAGE_SECONDS.labels(stage="cache_lookup")
+
+# runs on every request, so INFO records are sampled
+logger = get_hot_path_logger(__name__)
+
+
 class VehicleData:
     def __init__(self,
                 Gender,
@@ -46,8 +59,9 @@ class VehicleData:
         """
         try:
             
-            vehicle_input_dict = self.get_vehicle_data_as_dict()
-            return DataFrame(vehicle_input_dict)
+            with FRAME_BUILD_SECONDS.time():
+                vehicle_input_dict = self.get_vehicle_data_as_dict()
+                return DataFrame(vehicle_input_dict)
         
         except Exception as e:
             raise MyException(e, sys) from e
@@ -57,7 +71,7 @@ class VehicleData:
         """
         This function returns a dictionary from VehicleData class input
         """
-        logging.info("Entered get_usvisa_data_as_dict method as VehicleData class")
+        logger.info("Entered get_vehicle_data_as_dict method as VehicleData class")
 
         try:
             input_data = {
@@ -74,13 +88,31 @@ class VehicleData:
                 "Vehicle_Damage_Yes": [self.Vehicle_Damage_Yes]
             }
 
-            logging.info("Created vehicle data dict")
-            logging.info("Exited get_vehicle_data_as_dict method as VehicleData class")
+            logger.info("Created vehicle data dict")
+            logger.info("Exited get_vehicle_data_as_dict method as VehicleData class")
             return input_data
 
         except Exception as e:
             raise MyException(e, sys) from e
 
+    @staticmethod
+    def feature_tuple_from_record(record: dict) -> tuple:
+        """
+        Normalizes a feature record into a hashable tuple in model feature order,
+        so that e.g. 1, 1.0 and "1" give the same key. Missing features default to 0, as in the
+        inference plan, so a record scores the same with and without the cache.
+        Raises ValueError when a feature is not numeric.
+        """
+        return tuple(float(record.get(column, 0)) for column in PREDICTION_FEATURE_COLUMNS)
+
+    def get_feature_tuple(self) -> tuple:
+        return tuple(float(getattr(self, column)) for column in PREDICTION_FEATURE_COLUMNS)
+
+
+# Process-wide cache of (prediction, probability of class 1) per feature vector
+prediction_cache = PredictionCache()
+
+
 class VehicleDataClassifier:
     def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),) -> None:
         """
@@ -91,21 +123,107 @@ class VehicleDataClassifier:
         except Exception as e:
             raise MyException(e, sys)
 
+    def get_holder(self) -> ModelHolder:
+        return ModelHolder.get_holder(
+            bucket_name=self.prediction_pipeline_config.model_bucket_name,
+            model_path=self.prediction_pipeline_config.model_file_path,
+            refresh_interval=self.prediction_pipeline_config.model_refresh_interval,
+        )
+
+    def get_model(self):
+        """
+        Returns the process-wide cached production model, loading it on first use.
+        """
+        return self.get_holder().get_model()
+
+    def _score_records(self, records: List[dict]) -> Tuple[List[int], List[float]]:
+        """
+        Returns predictions and probabilities of class 1, answering repeated feature vectors
+        from the prediction cache and scoring only the remaining records with the model.
+        """
+        model, version = self.get_holder().get_versioned_model()
+        if not prediction_cache.enabled:
+            predictions, proba = model.predict_records_with_proba(records)
+            return predictions.astype(int).tolist(), proba[:, -1].tolist()
+
+        with CACHE_LOOKUP_SECONDS.time():
+            keys = [VehicleData.feature_tuple_from_record(record) for record in records]
+            results = prediction_cache.get_many(keys, version)
+        misses = [i for i, result in enumerate(results) if result is None]
+
+        if misses:
+            # score the normalized features, so a cached result only ever depends on its key
+            miss_records = [dict(zip(PREDICTION_FEATURE_COLUMNS, keys[i])) for i in misses]
+            predictions, proba = model.predict_records_with_proba(miss_records)
+            # classes_ are sorted, so the last column is the probability of class 1
+            computed = list(zip(predictions.astype(int).tolist(), proba[:, -1].tolist()))
+            for i, result in zip(misses, computed):
+                results[i] = result
+            prediction_cache.put_many([keys[i] for i in misses], computed, version)
+
+        return [result[0] for result in results], [result[1] for result in results]
+
     def predict(self, dataframe) -> str:
         """
         This is the method of VehicleDataClassifier
         Returns: Prediction in string format
         """
         try:
-            logging.info("Entered predict method of VehicleDataClassifier class")
-            model = VehicleEstimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
+            logger.info("Entered predict method of VehicleDataClassifier class")
+            if prediction_cache.enabled and set(PREDICTION_FEATURE_COLUMNS).issubset(dataframe.columns):
+                predictions, _ = self._score_records(dataframe[PREDICTION_FEATURE_COLUMNS].to_dict("records"))
+                return np.asarray(predictions)
+
+            model = self.get_model()
             result =  model.predict(dataframe)
             
             return result
         
         except Exception as e:
             raise MyException(e, sys)
-    
\ No newline at end of file
+
+    @staticmethod
+    def get_batch_input_data_frame(records: List[dict]) -> DataFrame:
+        """
+        Builds one columnar DataFrame from a list of JSON records holding the model features.
+        Raises ValueError when a feature is missing or is not numeric.
+        """
+        with FRAME_BUILD_SECONDS.time():
+            dataframe = DataFrame.from_records(records, columns=PREDICTION_FEATURE_COLUMNS)
+
+            missing = dataframe.columns[dataframe.isna().any()].to_list()
+            if missing:
+                raise ValueError(f"Missing values for features: {missing}")
+
+            return dataframe.apply(pd.to_numeric)
+
+    def predict_records(self, records: List[dict]) -> List[int]:
+        """
+        Scores a list of feature records with one model call, returns one prediction per record.
+        """
+        try:
+            if prediction_cache.enabled:
+                return self._score_records(records)[0]
+            return self.get_model().predict_records(records).astype(int).tolist()
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_batch(self, records: List[dict]) -> Tuple[List[int], List[float]]:
+        """
+        Scores a batch of records in one vectorized call.
+        Returns predictions and the probability of class 1, in input order.
+        """
+        try:
+            logger.info(f"Entered predict_batch method of VehicleDataClassifier class with {len(records)} records")
+            dataframe = self.get_batch_input_data_frame(records)
+            if prediction_cache.enabled:
+                return self._score_records(dataframe.to_dict("records"))
+
+            predictions, proba = self.get_model().predict_with_proba(dataframe)
+
+            # classes_ are sorted, so the last column is the probability of class 1
+            return predictions.astype(int).tolist(), proba[:, -1].tolist()
+
+        except Exception as e:
+            raise MyException(e, sys)
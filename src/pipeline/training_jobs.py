@@ -0,0 +1,175 @@
+import time
+import uuid
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional, Tuple
+
+from src.constants import TRAINING_JOB_HISTORY_SIZE
+from src.logger import logging
+
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    stages: Dict[str, dict] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        job = asdict(self)
+        if self.started_at is not None:
+            job["elapsed_seconds"] = (self.finished_at or time.time()) - self.started_at
+        return job
+
+
+def _run_training_job(job_id: str, events) -> None:
+    """
+    Entry point of the training worker process; streams progress events back to the server.
+    """
+    # Imported here so the serving process never loads the training stack
+    from src.pipeline.training_pipeline import TrainingPipeline
+
+    def on_progress(stage: str, status: str, elapsed: float) -> None:
+        events.put(("stage", job_id, stage, status, elapsed, time.time()))
+
+    try:
+        events.put(("job", job_id, "running", None, time.time()))
+        TrainingPipeline(progress_callback=on_progress).run_pipeline()
+        events.put(("job", job_id, "succeeded", None, time.time()))
+    except Exception as e:
+        events.put(("job", job_id, "failed", str(e), time.time()))
+
+
+class TrainingJobManager:
+
+    """
+    Runs TrainingPipeline jobs in the background, one at a time, each in its own worker process.
+
+    submit() returns immediately with a job id; while a job is queued or running, further
+    submissions return that same job instead of training twice. Stage-level progress and
+    timings are streamed back from the worker and exposed through get().
+    """
+
+    def __init__(self, history_size: int = TRAINING_JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[str]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        # spawn gives every job fresh module state (config timestamps, mongo client) and frees
+        # all training memory when the job ends
+        self._context = multiprocessing.get_context("spawn")
+
+    def submit(self) -> Tuple[TrainingJob, bool]:
+        """
+        Enqueues a training job.
+        Returns the job and True, or the already active job and False when deduplicated.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in ACTIVE_JOB_STATUSES:
+                    return job, False
+
+            job = TrainingJob(job_id=uuid.uuid4().hex)
+            self._jobs[job.job_id] = job
+            self._trim_history()
+            self._pending.put(job.job_id)
+            self._ensure_dispatcher()
+            logging.info(f"Training job {job.job_id} queued")
+            return job, True
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_status(self, job_id: str) -> Optional[dict]:
+        """Returns a snapshot of the job's status, stages and timings, None for unknown ids."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def _trim_history(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_JOB_STATUSES]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="training-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            job_id = self._pending.get()
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logging.error(f"Training job {job_id} could not be run: {e}")
+                self._finish(job_id, "failed", str(e), time.time())
+
+    def _run_job(self, job_id: str) -> None:
+        events = self._context.Queue()
+        # not a daemon: pipeline stages may start worker processes of their own
+        worker = self._context.Process(target=_run_training_job, args=(job_id, events),
+                                       name=f"training-{job_id}")
+        worker.start()
+
+        while worker.is_alive():
+            try:
+                self._apply_event(events.get(timeout=0.5))
+            except queue.Empty:
+                pass
+        worker.join()
+
+        # events flushed right before the worker exited
+        try:
+            while True:
+                self._apply_event(events.get(timeout=0.2))
+        except queue.Empty:
+            pass
+
+        job = self.get(job_id)
+        if job is not None and job.status in ACTIVE_JOB_STATUSES:
+            self._finish(job_id, "failed", f"Training worker exited with code {worker.exitcode}", time.time())
+
+    def _apply_event(self, event: tuple) -> None:
+        kind, job_id = event[0], event[1]
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if kind == "stage":
+                _, _, stage, status, elapsed, timestamp = event
+                entry = job.stages.setdefault(stage, {"status": status, "started_at": timestamp})
+                entry["status"] = status
+                if status != "running":
+                    entry["finished_at"] = timestamp
+                    entry["elapsed_seconds"] = elapsed
+                return
+
+        _, _, status, error, timestamp = event
+        if status == "running":
+            with self._lock:
+                job.status = "running"
+                job.started_at = timestamp
+        else:
+            self._finish(job_id, status, error, timestamp)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str], timestamp: float) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.status = status
+            job.error = error
+            job.finished_at = timestamp
+        logging.info(f"Training job {job_id} {status}")
@@ -1,9 +1,12 @@
 import sys 
+import time
+from typing import Callable, Optional
 from src.exception import MyException
 from src.logger import logging
 
 
-from src.entity.config_entity import (DataIngestionConfig, 
+from src.entity.config_entity import (TrainingPipelineConfig,
+                                      DataIngestionConfig, 
                                       DataValidationConfig,
                                       DataTransformationConfig,
                                       ModelTrainerConfig,
@@ -28,11 +31,18 @@ from src.entity.artifact_entity import( DataIngestionArtifact,
 
 class TrainingPipeline:
 
-    def __init__(self):
-        self.data_ingestion_config = DataIngestionConfig()
-        self.data_validation_config = DataValidationConfig()
-        self.data_transformation_config = DataTransformationConfig()
-        self.model_trainer_config = ModelTrainerConfig()
+    def __init__(self, progress_callback: Optional[Callable[[str, str, float], None]] = None):
+        """
+        :param progress_callback: Optional callable receiving (stage, status, elapsed_seconds)
+                                  when a stage starts ("running"), completes or fails
+        """
+        self.progress_callback = progress_callback
+        # one timestamped artifact directory shared by every stage of this run
+        self.training_pipeline_config = TrainingPipelineConfig()
+        self.data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
+        self.data_validation_config = DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
+        self.data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
+        self.model_trainer_config = ModelTrainerConfig(training_pipeline_config=self.training_pipeline_config)
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config  = ModelPusherConfig()
 
@@ -127,22 +137,44 @@ class TrainingPipeline:
         except Exception as e:
             raise MyException(e, sys) from e
 
+    def _run_stage(self, stage: str, stage_fn: Callable, **kwargs):
+        """
+        Runs one pipeline stage and reports its progress and duration to the progress callback.
+        """
+        self._notify(stage, "running", 0.0)
+        start = time.perf_counter()
+        try:
+            result = stage_fn(**kwargs)
+        except Exception:
+            self._notify(stage, "failed", time.perf_counter() - start)
+            raise
+        self._notify(stage, "completed", time.perf_counter() - start)
+        return result
+
+    def _notify(self, stage: str, status: str, elapsed: float) -> None:
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(stage, status, elapsed)
+        except Exception as e:
+            logging.warning(f"Progress callback failed for stage {stage}: {e}")
+
     def run_pipeline(self,) -> None:
 
         """
         This methos of TrainingPipeline class is responsible for running complete pipeline
         """
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact  = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact, model_trainer_artifact=model_trainer_artifact)
+            data_ingestion_artifact = self._run_stage("data_ingestion", self.start_data_ingestion)
+            data_validation_artifact = self._run_stage("data_validation", self.start_data_validation, data_ingestion_artifact=data_ingestion_artifact)
+            data_transformation_artifact = self._run_stage("data_transformation", self.start_data_transformation, data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
+            model_trainer_artifact  = self._run_stage("model_trainer", self.start_model_trainer, data_transformation_artifact=data_transformation_artifact)
+            model_evaluation_artifact = self._run_stage("model_evaluation", self.start_model_evaluation, data_ingestion_artifact=data_ingestion_artifact, model_trainer_artifact=model_trainer_artifact)
 
             if not model_evaluation_artifact.is_model_accepted:
                 logging.info(f"Model not accepted.")
 
-            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+            model_pusher_artifact = self._run_stage("model_pusher", self.start_model_pusher, model_evaluation_artifact=model_evaluation_artifact)
 
         except Exception as e:
             raise MyException(e, sys) from e
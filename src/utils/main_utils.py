@@ -84,4 +84,47 @@ def save_object(file_path: str, obj:object) -> None:
         logging.info("Exited the save object methos of utils")
 
     except Exception as e:
-        raise MyException(e, sys) from e
\ No newline at end of file
+        raise MyException(e, sys) from e
+
+
+def downcast_numeric_columns(dataframe, column_types: dict):
+    """
+    Returns the dataframe with its int columns in the smallest signed integer type of their range
+    (e.g. int8 for flags, int16 for ages). Float columns, and int columns with missing values, stay
+    float64: the scalers are fit on them and serving builds its features in float64, so a float32
+    copy would scale to different values in training than in serving.
+    """
+    import pandas as pd
+
+    try:
+        downcast = {}
+        for column, column_type in column_types.items():
+            if column not in dataframe.columns:
+                continue
+            values = dataframe[column]
+            if column_type == "int" and values.dtype.kind in "iu":
+                downcast[column] = pd.to_numeric(values, downcast="integer")
+        return dataframe.assign(**downcast) if downcast else dataframe
+
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def hash_fractions(ids, salt: str = ""):
+    """
+    Maps each id to a fixed number in [0, 1) from a 64-bit hash of the id and the salt, the same
+    for an id on every run and in every chunk. Integer ids hash by value, whatever their width.
+    """
+    import pandas as pd
+    try:
+        values = np.asarray(ids)
+        if values.dtype.kind in "iuf":
+            values = values.astype(np.int64).astype(np.uint64)
+        else:
+            values = values.astype(str).astype(object)
+        salt_hash = pd.util.hash_array(np.array([salt], dtype=object))[0]
+        hashes = pd.util.hash_array(pd.util.hash_array(values) ^ salt_hash)
+        # the top 53 bits are exact in a float64
+        return (hashes >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+    except Exception as e:
+        raise MyException(e, sys) from e